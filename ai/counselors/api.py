@@ -3,125 +3,221 @@ AI Prediction API Server
 Provides REST endpoints for the ImmunoDetect ML model
 """
 
-from flask import Flask, request, jsonify
-from flask_cors import CORS
-import pandas as pd
+from flask import Flask, Response, request, jsonify
 import numpy as np
 import joblib
+import hashlib
+import json
 import os
+import threading
 import traceback
 
+from model_artifacts import build_encoder_maps
+
+try:
+    import onnxruntime as ort
+except ImportError:  # ONNX Runtime is optional; fall back to XGBoost
+    ort = None
+
 app = Flask(__name__)
-CORS(app)
+
+# Known frontend origin; CORS headers are set directly instead of via flask_cors
+ALLOWED_ORIGIN = os.getenv("FRONTEND_URL", "http://localhost:3000")
+
+@app.after_request
+def add_cors_headers(response):
+    """Attach CORS headers (OPTIONS preflights are answered by Flask itself)."""
+    response.headers['Access-Control-Allow-Origin'] = ALLOWED_ORIGIN
+    response.headers['Access-Control-Allow-Headers'] = 'Content-Type'
+    response.headers['Access-Control-Allow-Methods'] = 'GET, POST, OPTIONS'
+    return response
 
 # Load the trained model
 MODEL_FILE = os.path.join(os.path.dirname(__file__), 'immunology_model.pkl')
+ONNX_MODEL_FILE = os.path.join(os.path.dirname(__file__), 'immunology_model.onnx')
 SYSTEM = None
+ONNX_SESSION = None
+FEATURE_INDEX = {}
+ENCODER_MAPS = {}
+GENE_FEATURE_IDX = {}
+FIELD_CONVERTERS = {}
+FEATURE_IMPORTANCES = None
+SCALER_MEAN = None
+SCALER_INV_SCALE = None
+MODEL_INFO_JSON = None
+MODEL_INFO_ETAG = None
+
+# Largest batch /predict_batch accepts; also bounds each thread's scratch matrix
+MAX_BATCH_SIZE = int(os.getenv("ML_API_MAX_BATCH", "256"))
+
+def build_model_info(system):
+    """Model information and metadata served by /model-info."""
+    info = {
+        "modelVersion": "1.0.0",
+        "featureCount": len(system['feature_names']),
+        "classes": list(system['encoders']['Diagnosis_Target'].classes_),
+        "features": system['feature_names'][:20]  # Return first 20 features
+    }
+    
+    if 'metrics' in system:
+        info['metrics'] = {
+            "accuracy": system['metrics'].get('accuracy'),
+            "precision": system['metrics'].get('precision'),
+            "recall": system['metrics'].get('recall'),
+            "f1_score": system['metrics'].get('f1_score')
+        }
+    
+    return info
+
+def load_onnx_session(n_features):
+    """Open the exported ONNX model (see export_onnx.py) if it is usable."""
+    if ort is None or not os.path.exists(ONNX_MODEL_FILE):
+        return None
+    session = ort.InferenceSession(ONNX_MODEL_FILE, providers=['CPUExecutionProvider'])
+    if session.get_inputs()[0].shape[-1] != n_features:
+        print(f"Warning: '{ONNX_MODEL_FILE}' does not match the loaded model. Using XGBoost.")
+        return None
+    print("Using ONNX Runtime for inference.")
+    return session
 
 def load_system():
     """Loads the model, encoders, and scaler once at startup."""
-    global SYSTEM
+    global SYSTEM, FEATURE_INDEX, ENCODER_MAPS, GENE_FEATURE_IDX, FIELD_CONVERTERS, FEATURE_IMPORTANCES
+    global SCALER_MEAN, SCALER_INV_SCALE, MODEL_INFO_JSON, MODEL_INFO_ETAG, ONNX_SESSION
     try:
         print(f"Loading AI System from {MODEL_FILE}...")
         SYSTEM = joblib.load(MODEL_FILE)
+        FEATURE_INDEX = {name: i for i, name in enumerate(SYSTEM['feature_names'])}
+        # Gene symbol (e.g. IL2RG) -> column of its expression feature
+        GENE_FEATURE_IDX = {
+            feat.replace("Gene_Exp_", "").replace("Control_Gene_", ""): idx
+            for feat, idx in FEATURE_INDEX.items()
+            if feat.startswith("Gene_Exp_") or feat.startswith("Control_Gene_")
+        }
+        ENCODER_MAPS = build_encoder_maps(SYSTEM['encoders'])
+        FIELD_CONVERTERS = build_field_converters()
+        # Scaler parameters for applying the transform inline on single rows.
+        # Scaling stays in float64 and only the result is rounded to float32,
+        # the precision trees compare in, so split decisions match XGBoost's.
+        SCALER_MEAN = SYSTEM['scaler'].mean_.astype(np.float64)
+        SCALER_INV_SCALE = (1.0 / SYSTEM['scaler'].scale_).astype(np.float64)
+        # Importances are static for a fitted model, so read them once
+        if hasattr(SYSTEM['model'], 'feature_importances_'):
+            FEATURE_IMPORTANCES = np.asarray(SYSTEM['model'].feature_importances_)
+        ONNX_SESSION = load_onnx_session(len(SYSTEM['feature_names']))
+        MODEL_INFO_JSON = json.dumps(build_model_info(SYSTEM)).encode()
+        MODEL_INFO_ETAG = hashlib.md5(MODEL_INFO_JSON).hexdigest()
         print("AI System loaded successfully!")
         return True
     except FileNotFoundError:
         print(f"Error: '{MODEL_FILE}' not found. Please run 'train_model.py' first!")
         return False
 
-def predict_patient_status(patient_data, gene_data=None):
-    """
-    Main function to predict disease.
-    Returns: (diagnosis, confidence, risk_level, all_probabilities, recommendations)
-    """
-    if SYSTEM is None:
-        return {
-            "error": "System not loaded",
-            "diagnosis": "Unknown",
-            "confidence": 0,
-            "riskLevel": "unknown"
-        }
-    
-    model = SYSTEM['model']
-    encoders = SYSTEM['encoders']
-    scaler = SYSTEM['scaler']
-    feature_names = SYSTEM['feature_names']
-    
-    # Create input DataFrame
-    input_df = pd.DataFrame(0, index=[0], columns=feature_names, dtype=float)
-    
-    # Map patient data to model features
-    feature_mapping = {
-        'ageYears': 'Age_Years',
-        'gender': 'Gender',
-        'familyHistory': 'Family_History',
-        'consanguinity': 'Consanguinity',
-        'infectionEarFreq': 'Infection_Ear_Freq',
-        'infectionLungFreq': 'Infection_Lung_Freq',
-        'persistentThrush': 'Persistent_Thrush',
-        'chronicDiarrhea': 'Chronic_Diarrhea',
-        'failureToThrive': 'Failure_to_Thrive',
-        'historyIVAntibiotics': 'History_IV_Antibiotics',
-        'labALCLevel': 'Lab_ALC_Level',
-        'labIgGLevel': 'Lab_IgG_Level',
-        'primaryGeneSymbol': 'Primary_Gene_Symbol',
-    }
-    
-    # Convert patient data to model input format
-    manual_data = {}
-    for key, value in patient_data.items():
-        if key in feature_mapping:
-            model_key = feature_mapping[key]
-            
-            # Handle boolean conversions
-            if isinstance(value, bool):
-                value = 'Yes' if value else 'No'
-            
-            manual_data[model_key] = value
-    
-    # Process manual inputs
-    for col, value in manual_data.items():
-        if col in feature_names:
-            if col in encoders:
-                try:
-                    encoded_val = encoders[col].transform([value])[0]
-                    input_df.at[0, col] = float(encoded_val)
-                except (ValueError, KeyError):
-                    input_df.at[0, col] = 0.0
+# Map patient data (frontend field names) to model features
+FEATURE_MAPPING = {
+    'ageYears': 'Age_Years',
+    'gender': 'Gender',
+    'familyHistory': 'Family_History',
+    'consanguinity': 'Consanguinity',
+    'infectionEarFreq': 'Infection_Ear_Freq',
+    'infectionLungFreq': 'Infection_Lung_Freq',
+    'persistentThrush': 'Persistent_Thrush',
+    'chronicDiarrhea': 'Chronic_Diarrhea',
+    'failureToThrive': 'Failure_to_Thrive',
+    'historyIVAntibiotics': 'History_IV_Antibiotics',
+    'labALCLevel': 'Lab_ALC_Level',
+    'labIgGLevel': 'Lab_IgG_Level',
+    'primaryGeneSymbol': 'Primary_Gene_Symbol',
+}
+
+REQUIRED_FIELDS = ['ageYears', 'gender', 'labALCLevel', 'labIgGLevel']
+
+# Per-thread scratch matrix reused by batch predictions
+_SCRATCH = threading.local()
+
+def predict_proba(X):
+    """Class probabilities for a 2-D feature matrix."""
+    if ONNX_SESSION is not None:
+        return ONNX_SESSION.run(None, {'input': X.astype(np.float32, copy=False)})[1]
+    return SYSTEM['model'].predict_proba(X)
+
+def _to_float(value):
+    """Numeric field converter; booleans and unparsable values become 0."""
+    if isinstance(value, bool):
+        return 0.0
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return 0.0
+
+def _yes_no(value):
+    return 'Yes' if value in (True, 'true', 'Yes', 1) else 'No'
+
+# Frontend values -> dataset categories (same normalization as inference.py);
+# e.g. the backend's 'Mild' symptom level has no class of its own and counts as 'No'
+VALUE_NORMALIZERS = {
+    'familyHistory': _yes_no,
+    'consanguinity': _yes_no,
+    'failureToThrive': _yes_no,
+    'historyIVAntibiotics': _yes_no,
+    'persistentThrush': lambda v: 'Persistent' if v in ('Persistent', 'Yes', True) else 'No',
+    'chronicDiarrhea': lambda v: 'Chronic' if v in ('Chronic', 'Yes', True) else 'No',
+}
+
+def _make_encoder(mapping, normalize=None):
+    """Categorical field converter; booleans map to the 'Yes'/'No' classes."""
+    def encode(value):
+        if normalize is not None:
+            value = normalize(value)
+        elif isinstance(value, bool):
+            value = 'Yes' if value else 'No'
+        return mapping.get(value, 0)
+    return encode
+
+def build_field_converters():
+    """Frontend field name -> (feature column, converter) for the loaded model."""
+    converters = {}
+    for key, col in FEATURE_MAPPING.items():
+        idx = FEATURE_INDEX.get(col)
+        if idx is not None:
+            if col in ENCODER_MAPS:
+                convert = _make_encoder(ENCODER_MAPS[col], VALUE_NORMALIZERS.get(key))
             else:
-                try:
-                    input_df.at[0, col] = float(value)
-                except (ValueError, TypeError):
-                    input_df.at[0, col] = 0.0
+                convert = _to_float
+            converters[key] = (idx, convert)
+    return converters
+
+def fill_feature_row(row, patient_data, gene_data=None):
+    """Write one patient's raw (unscaled) feature values into a zeroed row."""
+    # Process manual inputs with the converters compiled at load time
+    for key, value in patient_data.items():
+        target = FIELD_CONVERTERS.get(key)
+        if target is not None:
+            idx, convert = target
+            row[idx] = convert(value)
 
     # Process gene expression data if provided
     if gene_data:
-        for feature in feature_names:
-            if "Gene_Exp_" in feature or "Control_Gene_" in feature:
-                clean_name = feature.replace("Gene_Exp_", "").replace("Control_Gene_", "")
-                if clean_name in gene_data:
-                    input_df.at[0, feature] = float(gene_data[clean_name])
-
-    # Scale features
-    input_df_scaled = pd.DataFrame(
-        scaler.transform(input_df),
-        columns=feature_names,
-        index=input_df.index
-    )
+        for gene, value in gene_data.items():
+            idx = GENE_FEATURE_IDX.get(gene)
+            if idx is not None:
+                row[idx] = float(value)
 
-    # Predict
-    pred_idx = model.predict(input_df_scaled)[0]
-    pred_probs = model.predict_proba(input_df_scaled)[0]
+    return row
+
+def build_prediction(patient_data, pred_idx, pred_probs, scaled_row):
+    """Turn one row of class probabilities into the API prediction payload."""
+    model = SYSTEM['model']
+    feature_names = SYSTEM['feature_names']
     
     # Decode prediction
-    target_encoder = encoders['Diagnosis_Target']
-    diagnosis = target_encoder.inverse_transform([pred_idx])[0]
+    target_encoder = SYSTEM['encoders']['Diagnosis_Target']
+    diagnosis = target_encoder.classes_[pred_idx]
     confidence = float(pred_probs[pred_idx])
     
     # Get all class probabilities
     all_classes = target_encoder.classes_
-    all_probs = {cls: float(prob) for cls, prob in zip(all_classes, pred_probs)}
+    all_probs = dict(zip(all_classes.tolist(), pred_probs.tolist()))
     
     # Determine risk level based on diagnosis and confidence
     risk_level = determine_risk_level(diagnosis, confidence, patient_data)
@@ -130,7 +226,7 @@ def predict_patient_status(patient_data, gene_data=None):
     recommendations = get_recommendations(diagnosis, risk_level, patient_data)
     
     # Get feature importance for explainability
-    feature_importance = get_feature_importance(model, feature_names, input_df_scaled)
+    feature_importance = get_feature_importance(model, feature_names, scaled_row)
     
     return {
         "diagnosis": diagnosis,
@@ -143,6 +239,68 @@ def predict_patient_status(patient_data, gene_data=None):
         "modelVersion": "1.0.0"
     }
 
+def predict_patient_status(patient_data, gene_data=None):
+    """
+    Main function to predict disease.
+    Returns: (diagnosis, confidence, risk_level, all_probabilities, recommendations)
+    """
+    if SYSTEM is None:
+        return {
+            "error": "System not loaded",
+            "diagnosis": "Unknown",
+            "confidence": 0,
+            "riskLevel": "unknown"
+        }
+    
+    # Preallocated input row, filled by feature index
+    row = np.zeros(len(SYSTEM['feature_names']), dtype=np.float64)
+    fill_feature_row(row, patient_data, gene_data)
+
+    # Scale features inline; same result as scaler.transform without its validation overhead
+    input_scaled = ((row - SCALER_MEAN) * SCALER_INV_SCALE).astype(np.float32).reshape(1, -1)
+
+    # Predict
+    # One booster pass: the predicted class is the argmax of the probabilities
+    pred_probs = predict_proba(input_scaled)[0]
+    pred_idx = int(np.argmax(pred_probs))
+    
+    return build_prediction(patient_data, pred_idx, pred_probs, input_scaled[0])
+
+def predict_batch_status(patients):
+    """
+    Predict many patients with one scaler and one model call.
+    Each item is a dict with patientData and optional geneData.
+    """
+    if not patients:
+        return []
+    if SYSTEM is None:
+        return [predict_patient_status(p.get('patientData', {})) for p in patients]
+    
+    n_rows = len(patients)
+    n_features = len(SYSTEM['feature_names'])
+    
+    # Reuse this thread's scratch matrix, growing it only when needed
+    scratch = getattr(_SCRATCH, 'matrix', None)
+    if scratch is None or scratch.shape[0] < n_rows or scratch.shape[1] != n_features:
+        scratch = np.zeros((max(n_rows, 1), n_features), dtype=np.float64)
+        _SCRATCH.matrix = scratch
+    X = scratch[:n_rows]
+    X.fill(0.0)
+    
+    for i, item in enumerate(patients):
+        fill_feature_row(X[i], item.get('patientData', {}), item.get('geneData'))
+    
+    # Same inline scaling as predict_patient_status, so both paths give identical rows
+    X_scaled = ((X - SCALER_MEAN) * SCALER_INV_SCALE).astype(np.float32)
+    all_pred_probs = predict_proba(X_scaled)
+    pred_indices = np.argmax(all_pred_probs, axis=1)
+    
+    return [
+        build_prediction(item.get('patientData', {}), int(pred_idx), pred_probs, scaled_row)
+        for item, pred_idx, pred_probs, scaled_row
+        in zip(patients, pred_indices, all_pred_probs, X_scaled)
+    ]
+
 def determine_risk_level(diagnosis, confidence, patient_data):
     """Determine risk level based on diagnosis and patient data."""
     # SCID cases are always high/critical risk
@@ -187,38 +345,38 @@ def calculate_risk_score(diagnosis, confidence, patient_data):
     
     return min(100, max(0, round(score)))
 
+# Base recommendations per diagnosis class; copied before lab-specific items are appended
+RECOMMENDATIONS = {
+    'SCID_X_Linked': (
+        "Immediate consultation with pediatric immunologist",
+        "Consider hematopoietic stem cell transplantation (HSCT)",
+        "Implement protective isolation protocols",
+        "Avoid live vaccines",
+        "Prophylactic antimicrobial therapy"
+    ),
+    'SCID_ADA': (
+        "Immediate consultation with pediatric immunologist",
+        "Consider enzyme replacement therapy (PEG-ADA)",
+        "Evaluate for gene therapy eligibility",
+        "Implement protective isolation protocols",
+        "Regular metabolic monitoring"
+    ),
+    'Healthy': (
+        "Continue routine pediatric care",
+        "Follow standard immunization schedule",
+        "Monitor for any new symptoms"
+    ),
+}
+
+DEFAULT_RECOMMENDATIONS = (
+    "Consult with immunologist for further evaluation",
+    "Consider additional genetic testing",
+    "Monitor immune function parameters"
+)
+
 def get_recommendations(diagnosis, risk_level, patient_data):
     """Get treatment recommendations based on diagnosis."""
-    recommendations = []
-    
-    if 'SCID_X_Linked' in diagnosis:
-        recommendations = [
-            "Immediate consultation with pediatric immunologist",
-            "Consider hematopoietic stem cell transplantation (HSCT)",
-            "Implement protective isolation protocols",
-            "Avoid live vaccines",
-            "Prophylactic antimicrobial therapy"
-        ]
-    elif 'SCID_ADA' in diagnosis:
-        recommendations = [
-            "Immediate consultation with pediatric immunologist",
-            "Consider enzyme replacement therapy (PEG-ADA)",
-            "Evaluate for gene therapy eligibility",
-            "Implement protective isolation protocols",
-            "Regular metabolic monitoring"
-        ]
-    elif 'Healthy' in diagnosis:
-        recommendations = [
-            "Continue routine pediatric care",
-            "Follow standard immunization schedule",
-            "Monitor for any new symptoms"
-        ]
-    else:
-        recommendations = [
-            "Consult with immunologist for further evaluation",
-            "Consider additional genetic testing",
-            "Monitor immune function parameters"
-        ]
+    recommendations = list(RECOMMENDATIONS.get(diagnosis, DEFAULT_RECOMMENDATIONS))
     
     # Add lab-specific recommendations
     alc_level = patient_data.get('labALCLevel', 1000)
@@ -227,18 +385,22 @@ def get_recommendations(diagnosis, risk_level, patient_data):
     
     return recommendations
 
-def get_feature_importance(model, feature_names, input_df):
+def get_feature_importance(model, feature_names, input_row):
     """Extract feature importance from XGBoost model."""
     try:
-        importances = model.feature_importances_
+        importances = FEATURE_IMPORTANCES
+        if importances is None:
+            importances = np.asarray(model.feature_importances_)
         feature_importance = []
         
-        # Get top 10 most important features
-        indices = np.argsort(importances)[-10:][::-1]
+        # Get top 10 most important features (partition, then sort only those)
+        k = min(10, importances.size)
+        top = np.argpartition(importances, -k)[-k:]
+        indices = top[np.argsort(importances[top])[::-1]]
         
         for idx in indices:
             if importances[idx] > 0.01:  # Only include meaningful features
-                value = float(input_df.iloc[0, idx])
+                value = float(input_row[idx])
                 feature_importance.append({
                     "feature": feature_names[idx],
                     "importance": round(float(importances[idx]), 4),
@@ -275,8 +437,7 @@ def predict():
         gene_data = data.get('geneData', None)
         
         # Validate required fields
-        required_fields = ['ageYears', 'gender', 'labALCLevel', 'labIgGLevel']
-        missing_fields = [f for f in required_fields if f not in patient_data]
+        missing_fields = [f for f in REQUIRED_FIELDS if f not in patient_data]
         
         if missing_fields:
             return jsonify({
@@ -298,28 +459,61 @@ def predict():
         }), 500
 
 
+@app.route('/predict_batch', methods=['POST'])
+def predict_batch():
+    """
+    Batch prediction endpoint.
+    Expects JSON with a patients list, each item holding patientData and optional geneData.
+    """
+    try:
+        data = request.get_json()
+        
+        if not data or not isinstance(data.get('patients'), list):
+            return jsonify({"error": "No patients provided"}), 400
+        
+        patients = data['patients']
+        if not patients:
+            return jsonify({"error": "No patients provided"}), 400
+        if len(patients) > MAX_BATCH_SIZE:
+            return jsonify({
+                "error": f"Too many patients: {len(patients)} (maximum {MAX_BATCH_SIZE} per request)"
+            }), 400
+        
+        # Validate required fields for every patient
+        for i, item in enumerate(patients):
+            patient_data = item.get('patientData', {}) if isinstance(item, dict) else {}
+            missing_fields = [f for f in REQUIRED_FIELDS if f not in patient_data]
+            if missing_fields:
+                return jsonify({
+                    "error": f"Patient {i}: missing required fields: {', '.join(missing_fields)}"
+                }), 400
+        
+        results = predict_batch_status(patients)
+        
+        return jsonify({
+            "success": True,
+            "predictions": results
+        })
+        
+    except Exception as e:
+        traceback.print_exc()
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
+
+
 @app.route('/model-info', methods=['GET'])
 def model_info():
     """Get model information and metadata."""
     if SYSTEM is None:
         return jsonify({"error": "Model not loaded"}), 500
     
-    info = {
-        "modelVersion": "1.0.0",
-        "featureCount": len(SYSTEM['feature_names']),
-        "classes": list(SYSTEM['encoders']['Diagnosis_Target'].classes_),
-        "features": SYSTEM['feature_names'][:20]  # Return first 20 features
-    }
-    
-    if 'metrics' in SYSTEM:
-        info['metrics'] = {
-            "accuracy": SYSTEM['metrics'].get('accuracy'),
-            "precision": SYSTEM['metrics'].get('precision'),
-            "recall": SYSTEM['metrics'].get('recall'),
-            "f1_score": SYSTEM['metrics'].get('f1_score')
-        }
-    
-    return jsonify(info)
+    # The model is immutable at runtime, so the body is serialized once at load
+    response = Response(MODEL_INFO_JSON, mimetype='application/json')
+    response.set_etag(MODEL_INFO_ETAG)
+    response.headers['Cache-Control'] = 'public, max-age=86400'
+    return response.make_conditional(request)
 
 
 if __name__ == '__main__':
@@ -1,25 +1,24 @@
 import pandas as pd
 import numpy as np
-import random
 from faker import Faker # Library for realistic names
 
 # Configuration
 NUM_SAMPLES = 1000
 OUTPUT_FILENAME = 'immunogenomics_dataset.csv'
+CSV_CHUNKSIZE = 100_000
+NAME_POOL_SIZE = 2000  # Faker names generated per gender, then sampled per row
 
 # Set seeds for reproducibility
 np.random.seed(42)
-random.seed(42)
 fake = Faker()
 
 def generate_dataset():
-    data = []
-    
     # --- 1. DEFINE GENES AND DIAGNOSES ---
     # The list of genes involved in the panel (from your image + controls)
     target_genes = ['IL2RG', 'ADA', 'BTK', 'JAK3', 'RAG1', 'RAG2', 'IL7R', 'CD3D', 'CD3E', 'ZAP70', 'LIG4']
     control_genes = ['GAPDH', 'ACTB']
     all_genes = target_genes + control_genes
+    gene_idx = {gene: i for i, gene in enumerate(all_genes)}
     
     # Disease Classes (Balanced: 50% Healthy, 50% Pathological)
     diagnoses = [
@@ -37,151 +36,136 @@ def generate_dataset():
     
     print(f"Generating {NUM_SAMPLES} patient records with names...")
 
-    for i in range(NUM_SAMPLES):
-        diagnosis = assigned_diagnoses[i]
-        
-        # --- 2. ASSIGN PRIMARY GENE DEFECT ---
-        if diagnosis == 'Healthy':
-            primary_gene = 'None'
-        elif diagnosis == 'SCID_X_Linked':
-            primary_gene = 'IL2RG'
-        elif diagnosis == 'SCID_ADA':
-            primary_gene = 'ADA'
-        elif diagnosis == 'XLA_Brutons':
-            primary_gene = 'BTK'
-        elif diagnosis == 'SCID_Autosomal':
-            primary_gene = np.random.choice(['JAK3', 'RAG1', 'RAG2', 'IL7R'])
-        elif diagnosis == 'CVID':
-            primary_gene = 'None' 
-
-        # --- 3. DEMOGRAPHICS (Gender & Name) ---
-        # Gender Logic: X-Linked diseases affect males almost exclusively
-        if diagnosis in ['SCID_X_Linked', 'XLA_Brutons']:
-            gender = 'Male'
-            patient_name = fake.name_male()
-        else:
-            gender = np.random.choice(['Male', 'Female'])
-            if gender == 'Male':
-                patient_name = fake.name_male()
-            else:
-                patient_name = fake.name_female()
-            
-        # Age: SCID is pediatric (<1 year usually), CVID/XLA can be older
-        if "SCID" in diagnosis:
-            age_years = round(np.random.uniform(0.1, 2.0), 1)
-        elif diagnosis == 'Healthy':
-            age_years = round(np.random.uniform(0.1, 40.0), 1)
-        else:
-            age_years = round(np.random.uniform(2.0, 30.0), 1)
+    # Every column is drawn in one vectorized call, then overwritten per
+    # diagnosis group through boolean masks.
+    is_healthy = assigned_diagnoses == 'Healthy'
+    is_sick = ~is_healthy
+    is_scid = np.char.find(assigned_diagnoses.astype(str), 'SCID') >= 0
+    is_xla = assigned_diagnoses == 'XLA_Brutons'
+    is_cvid = assigned_diagnoses == 'CVID'
+    is_autosomal = assigned_diagnoses == 'SCID_Autosomal'
 
-        # Family History & Consanguinity
-        fam_history = 'No'
-        consanguinity = 'No'
-        
-        if diagnosis in ['SCID_ADA', 'SCID_Autosomal'] and random.random() < 0.6:
-            consanguinity = 'Yes'
-        if diagnosis != 'Healthy' and random.random() < 0.4:
-            fam_history = 'Yes'
-
-        # --- 4. CLINICAL SYMPTOMS & LABS ---
-        # Defaults (Healthy)
-        inf_ear = np.random.randint(0, 2)
-        inf_lung = 0
-        thrush = 'No'
-        diarrhea = 'No'
-        ftt = 'No'
-        iv_antibiotics = 'No'
-        alc = int(np.random.normal(3000, 500)) # Normal Lymphocytes
-        igg = int(np.random.normal(1000, 200)) # Normal Antibodies
-
-        # Adjust for Disease
-        if diagnosis != 'Healthy':
-            inf_ear = np.random.randint(4, 12)
-            if random.random() > 0.3: iv_antibiotics = 'Yes'
-            
-            if "SCID" in diagnosis:
-                inf_lung = np.random.randint(2, 6)
-                thrush = 'Persistent'
-                diarrhea = 'Chronic'
-                ftt = 'Yes'
-                alc = int(np.random.normal(400, 200)) # Severe Lymphopenia
-                igg = int(np.random.normal(200, 100)) # Low maternal antibodies
-                if alc < 0: alc = 50
-                
-            elif diagnosis == "XLA_Brutons":
-                inf_lung = np.random.randint(1, 4)
-                alc = int(np.random.normal(2500, 500)) 
-                igg = int(np.random.normal(50, 40))    # B-cells Absent
-                if igg < 0: igg = 10
-                
-            elif diagnosis == "CVID":
-                inf_lung = np.random.randint(1, 5)
-                alc = int(np.random.normal(1800, 400)) 
-                igg = int(np.random.normal(350, 100))  
-
-        # --- 5. GENE EXPRESSION (Log2 Fold Change) ---
-        gene_expr_data = {}
-        for gene in all_genes:
-            val = np.random.normal(0, 0.3)
-            gene_expr_data[gene] = val
-            
-        if primary_gene != 'None':
-            gene_expr_data[primary_gene] = np.random.normal(-5.5, 1.0)
-            
-        if primary_gene == 'IL2RG':
-            gene_expr_data['JAK3'] = np.random.normal(-1.5, 0.5)
-
-        # --- 6. OUTPUTS ---
-        if diagnosis == 'Healthy':
-            risk_score = np.random.randint(1, 10)
-            severity = "None"
-            action = "Routine Vaccination"
-        else:
-            risk_score = np.random.randint(85, 99)
-            if "SCID" in diagnosis:
-                severity = "High"
-                action = "URGENT: Isolation & HSCT Referral"
-            elif diagnosis == "XLA_Brutons":
-                severity = "Moderate"
-                action = "Start IVIG Therapy"
-            else:
-                severity = "Moderate"
-                action = "Refer to Immunologist"
-
-        # Build Row
-        row = [
-            patient_name, age_years, gender, fam_history, consanguinity,
-            primary_gene,
-            inf_ear, inf_lung, thrush, diarrhea, ftt, iv_antibiotics,
-            alc, igg
-        ]
+    # --- 2. ASSIGN PRIMARY GENE DEFECT ---
+    primary_gene = np.full(NUM_SAMPLES, 'None', dtype=object)
+    primary_gene[assigned_diagnoses == 'SCID_X_Linked'] = 'IL2RG'
+    primary_gene[assigned_diagnoses == 'SCID_ADA'] = 'ADA'
+    primary_gene[is_xla] = 'BTK'
+    primary_gene[is_autosomal] = np.random.choice(['JAK3', 'RAG1', 'RAG2', 'IL7R'], is_autosomal.sum())
+
+    # --- 3. DEMOGRAPHICS (Gender & Name) ---
+    # Gender Logic: X-Linked diseases affect males almost exclusively
+    gender = np.random.choice(['Male', 'Female'], NUM_SAMPLES)
+    gender[np.isin(assigned_diagnoses, ['SCID_X_Linked', 'XLA_Brutons'])] = 'Male'
+    is_male = gender == 'Male'
+    # Faker is slow per call, so each gender gets a fixed-size name pool (no
+    # larger than that gender's row count) and rows sample from it
+    n_male = int(is_male.sum())
+    n_female = NUM_SAMPLES - n_male
+    male_pool = np.array([fake.name_male() for _ in range(min(NAME_POOL_SIZE, n_male))], dtype=object)
+    female_pool = np.array([fake.name_female() for _ in range(min(NAME_POOL_SIZE, n_female))], dtype=object)
+    patient_name = np.empty(NUM_SAMPLES, dtype=object)
+    if n_male:
+        patient_name[is_male] = np.random.choice(male_pool, n_male)
+    if n_female:
+        patient_name[~is_male] = np.random.choice(female_pool, n_female)
         
-        # Add genes
-        for gene in all_genes:
-            row.append(gene_expr_data[gene])
-            
-        # Add outputs
-        row.extend([diagnosis, risk_score, severity, action])
-        data.append(row)
-
-    # Create Columns List
-    cols = [
-        'Patient_Name', 'Age_Years', 'Gender', 'Family_History', 'Consanguinity',
-        'Primary_Gene_Symbol',
-        'Infection_Ear_Freq', 'Infection_Lung_Freq', 'Persistent_Thrush', 'Chronic_Diarrhea', 'Failure_to_Thrive', 'History_IV_Antibiotics',
-        'Lab_ALC_Level', 'Lab_IgG_Level'
-    ]
+    # Age: SCID is pediatric (<1 year usually), CVID/XLA can be older
+    age_years = np.random.uniform(2.0, 30.0, NUM_SAMPLES)
+    age_years[is_scid] = np.random.uniform(0.1, 2.0, is_scid.sum())
+    age_years[is_healthy] = np.random.uniform(0.1, 40.0, is_healthy.sum())
+    age_years = np.round(age_years, 1)
+
+    # Family History & Consanguinity
+    consanguinity = np.where(
+        np.isin(assigned_diagnoses, ['SCID_ADA', 'SCID_Autosomal']) & (np.random.random(NUM_SAMPLES) < 0.6),
+        'Yes', 'No'
+    )
+    fam_history = np.where(is_sick & (np.random.random(NUM_SAMPLES) < 0.4), 'Yes', 'No')
+
+    # --- 4. CLINICAL SYMPTOMS & LABS ---
+    # Defaults (Healthy)
+    inf_ear = np.random.randint(0, 2, NUM_SAMPLES)
+    inf_lung = np.zeros(NUM_SAMPLES, dtype=int)
+    alc = np.random.normal(3000, 500, NUM_SAMPLES).astype(int) # Normal Lymphocytes
+    igg = np.random.normal(1000, 200, NUM_SAMPLES).astype(int) # Normal Antibodies
+
+    # Adjust for Disease
+    inf_ear[is_sick] = np.random.randint(4, 12, is_sick.sum())
+    iv_antibiotics = np.where(is_sick & (np.random.random(NUM_SAMPLES) > 0.3), 'Yes', 'No')
+
+    thrush = np.where(is_scid, 'Persistent', 'No')
+    diarrhea = np.where(is_scid, 'Chronic', 'No')
+    ftt = np.where(is_scid, 'Yes', 'No')
+    inf_lung[is_scid] = np.random.randint(2, 6, is_scid.sum())
+    alc[is_scid] = np.random.normal(400, 200, is_scid.sum()).astype(int) # Severe Lymphopenia
+    igg[is_scid] = np.random.normal(200, 100, is_scid.sum()).astype(int) # Low maternal antibodies
+
+    inf_lung[is_xla] = np.random.randint(1, 4, is_xla.sum())
+    alc[is_xla] = np.random.normal(2500, 500, is_xla.sum()).astype(int)
+    igg[is_xla] = np.maximum(np.random.normal(50, 40, is_xla.sum()).astype(int), 10)    # B-cells Absent
+
+    inf_lung[is_cvid] = np.random.randint(1, 5, is_cvid.sum())
+    alc[is_cvid] = np.random.normal(1800, 400, is_cvid.sum()).astype(int)
+    igg[is_cvid] = np.random.normal(350, 100, is_cvid.sum()).astype(int)
+
+    # Lymphocyte counts never drop below 50 (only severe lymphopenia gets close)
+    np.clip(alc, 50, None, out=alc)
+
+    # --- 5. GENE EXPRESSION (Log2 Fold Change) ---
+    gene_matrix = np.random.normal(0, 0.3, (NUM_SAMPLES, len(all_genes)))
+    
+    has_defect = primary_gene != 'None'
+    defect_rows = np.flatnonzero(has_defect)
+    defect_cols = np.array([gene_idx[g] for g in primary_gene[has_defect]], dtype=int)
+    gene_matrix[defect_rows, defect_cols] = np.random.normal(-5.5, 1.0, defect_rows.size)
+    
+    is_il2rg = primary_gene == 'IL2RG'
+    gene_matrix[is_il2rg, gene_idx['JAK3']] = np.random.normal(-1.5, 0.5, is_il2rg.sum())
+    # Four decimals is plenty for log2 fold changes and keeps the CSV compact;
+    # other float columns (e.g. Age_Years) keep their own precision
+    gene_matrix = np.round(gene_matrix, 4)
+
+    # --- 6. OUTPUTS ---
+    risk_score = np.random.randint(85, 99, NUM_SAMPLES)
+    risk_score[is_healthy] = np.random.randint(1, 10, is_healthy.sum())
+    severity = np.select([is_healthy, is_scid], ["None", "High"], default="Moderate")
+    action = np.select(
+        [is_healthy, is_scid, is_xla],
+        ["Routine Vaccination", "URGENT: Isolation & HSCT Referral", "Start IVIG Therapy"],
+        default="Refer to Immunologist"
+    )
+
+    # Build Columns
+    columns = {
+        'Patient_Name': patient_name,
+        'Age_Years': age_years,
+        'Gender': gender,
+        'Family_History': fam_history,
+        'Consanguinity': consanguinity,
+        'Primary_Gene_Symbol': primary_gene,
+        'Infection_Ear_Freq': inf_ear,
+        'Infection_Lung_Freq': inf_lung,
+        'Persistent_Thrush': thrush,
+        'Chronic_Diarrhea': diarrhea,
+        'Failure_to_Thrive': ftt,
+        'History_IV_Antibiotics': iv_antibiotics,
+        'Lab_ALC_Level': alc,
+        'Lab_IgG_Level': igg,
+    }
     for gene in all_genes:
         if gene in control_genes:
-            cols.append(f"Control_Gene_{gene}")
+            columns[f"Control_Gene_{gene}"] = gene_matrix[:, gene_idx[gene]]
         else:
-            cols.append(f"Gene_Exp_{gene}")
+            columns[f"Gene_Exp_{gene}"] = gene_matrix[:, gene_idx[gene]]
             
-    cols.extend(['Diagnosis_Target', 'Risk_Score_Prediction', 'Severity_Level', 'Recommended_Action'])
+    columns['Diagnosis_Target'] = assigned_diagnoses
+    columns['Risk_Score_Prediction'] = risk_score
+    columns['Severity_Level'] = severity
+    columns['Recommended_Action'] = action
     
-    # Save
-    df = pd.DataFrame(data, columns=cols)
-    df.to_csv(OUTPUT_FILENAME, index=False)
+    # Save (columns stay as contiguous arrays; rows are written in bounded chunks)
+    df = pd.DataFrame(columns)
+    df.to_csv(OUTPUT_FILENAME, index=False, chunksize=CSV_CHUNKSIZE)
     print(f"Success! Dataset with names saved to {OUTPUT_FILENAME}")
     print(df[['Patient_Name', 'Gender', 'Diagnosis_Target']].head())
 
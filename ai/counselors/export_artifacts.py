@@ -0,0 +1,71 @@
+"""
+Exports the trained model to pickle-free artifacts for fast cold starts:
+  - immunology_model.ubj            XGBoost booster (native UBJSON format)
+  - immunology_model.safetensors    scaler mean/scale and feature importances
+  - immunology_model.meta.json      feature names, encoder classes, model params
+ml_api.py loads these instead of the pickle when they are present.
+Requires: pip install safetensors
+"""
+
+import json
+import math
+import joblib
+import numpy as np
+from safetensors.numpy import save_file
+
+from model_artifacts import encoder_classes
+
+MODEL_FILE = 'immunology_model.pkl'
+BOOSTER_FILE = 'immunology_model.ubj'
+ARRAYS_FILE = 'immunology_model.safetensors'
+META_FILE = 'immunology_model.meta.json'
+
+# Bump when the layout of the files above changes; ml_api.py checks it on load
+ARTIFACTS_FORMAT_VERSION = 1
+
+def export_artifacts(system):
+    """Write the three artifact files from an in-memory training artifacts dict."""
+    model = system['model']
+    encoders = system['encoders']
+    scaler = system['scaler']
+    feature_names = list(system['feature_names'])
+
+    model.get_booster().save_model(BOOSTER_FILE)
+
+    save_file({
+        'scaler_mean': np.ascontiguousarray(scaler.mean_, dtype=np.float64),
+        'scaler_scale': np.ascontiguousarray(scaler.scale_, dtype=np.float64),
+        'feature_importances': np.ascontiguousarray(model.feature_importances_, dtype=np.float32),
+    }, ARRAYS_FILE)
+
+    # get_params() contains NaN (e.g. `missing`), which is not valid JSON
+    params = {
+        key: None if isinstance(value, float) and not math.isfinite(value) else value
+        for key, value in model.get_params().items()
+    }
+    if hasattr(scaler, 'feature_names_in_'):
+        scaled_columns = list(scaler.feature_names_in_)
+    else:
+        scaled_columns = [col for col in feature_names if col not in encoders]
+
+    meta = {
+        'format_version': ARTIFACTS_FORMAT_VERSION,
+        'feature_names': feature_names,
+        'scaled_columns': scaled_columns,
+        'encoder_classes': {
+            col: [str(cls) for cls in encoder_classes(enc)] for col, enc in encoders.items()
+        },
+        'model_params': params,
+        'metrics': system.get('metrics', {}),
+    }
+    with open(META_FILE, 'w') as f:
+        json.dump(meta, f, indent=2, default=str)
+
+    print(f"[SUCCESS] Artifacts saved to '{BOOSTER_FILE}', '{ARRAYS_FILE}', '{META_FILE}'")
+
+if __name__ == "__main__":
+    print(f"--- Loading {MODEL_FILE} ---")
+    try:
+        export_artifacts(joblib.load(MODEL_FILE))
+    except FileNotFoundError:
+        print(f"Error: '{MODEL_FILE}' not found. Please run 'train_model.py' first!")
@@ -0,0 +1,25 @@
+"""
+Gunicorn configuration for the AI Prediction API Server
+Usage: gunicorn -c gunicorn_conf.py api:app
+"""
+
+import os
+from multiprocessing import cpu_count
+
+bind = os.getenv("ML_API_BIND", "0.0.0.0:5001")
+
+# Predictions are CPU-bound XGBoost calls, so plain sync workers scale with cores
+workers = int(os.getenv("ML_API_WORKERS", 2 * cpu_count() + 1))
+worker_class = "sync"
+
+# Import the app in the master so the model is loaded once and shared
+# copy-on-write with every forked worker
+preload_app = True
+
+
+def on_starting(server):
+    """Load the model in the master process before workers are forked."""
+    import api
+
+    if not api.load_system():
+        raise RuntimeError("Failed to load model. Server not started.")
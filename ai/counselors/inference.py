@@ -1,29 +1,81 @@
 #!/usr/bin/env python3
 """
 ML Inference Module for ImmunoDetect
-This module provides prediction functionality that can be called from Node.js
+Command-line diagnostics for the trained model. The backend talks to the
+long-running prediction service (api.py) over HTTP instead of spawning this script.
 Usage: python inference.py '{"ageYears": 0.5, "gender": "Male", ...}'
 """
 
 import sys
 import json
 import os
+import threading
+from datetime import datetime
+
+from model_artifacts import build_encoder_maps
 
 # Change to the script's directory to find the model file
 os.chdir(os.path.dirname(os.path.abspath(__file__)))
 
-import pandas as pd
-import numpy as np
-import joblib
+# numpy and joblib are imported inside the functions that need them so the
+# CLI's argument/JSON error paths start without loading the scientific stack
 
 MODEL_FILE = 'immunology_model.pkl'
+# Risk level per diagnosis class
+RISK_LEVELS = {
+    'Healthy': 'low',
+    'SCID_ADA': 'critical',
+    'SCID_X_Linked': 'critical',
+}
+
+# Base recommendations per diagnosis class; copied before dynamic items are appended
+RECOMMENDATIONS = {
+    'Healthy': (
+        "Continue routine monitoring and follow-up",
+        "Maintain current immunization schedule",
+    ),
+    'SCID_X_Linked': (
+        "URGENT: Refer to pediatric immunologist immediately",
+        "Initiate protective isolation protocols",
+        "Genetic counseling for IL2RG mutation confirmation",
+        "Evaluate for bone marrow transplant eligibility",
+        "Avoid live vaccines until immune function is restored",
+    ),
+    'SCID_ADA': (
+        "URGENT: Refer to pediatric immunologist immediately",
+        "Consider ADA enzyme replacement therapy (PEG-ADA)",
+        "Genetic testing to confirm ADA gene mutation",
+        "Evaluate for gene therapy clinical trials",
+        "Initiate protective isolation protocols",
+    ),
+}
+
+SYSTEM = None
+FEATURE_INDEX = {}
+ENCODER_MAPS = {}
+SCALER_MEAN = None
+SCALER_INV_SCALE = None
+_SYSTEM_LOCK = threading.Lock()
 
 def load_model():
-    """Load the trained model and artifacts."""
-    try:
-        return joblib.load(MODEL_FILE)
-    except FileNotFoundError:
-        return None
+    """Load the trained model and artifacts (cached after the first call)."""
+    global SYSTEM, FEATURE_INDEX, ENCODER_MAPS, SCALER_MEAN, SCALER_INV_SCALE
+    if SYSTEM is None:
+        with _SYSTEM_LOCK:
+            if SYSTEM is None:
+                import joblib
+                import numpy as np
+                try:
+                    system = joblib.load(MODEL_FILE)
+                except FileNotFoundError:
+                    return None
+                FEATURE_INDEX = {name: i for i, name in enumerate(system['feature_names'])}
+                ENCODER_MAPS = build_encoder_maps(system['encoders'])
+                # Scaler parameters for scaling the single input row inline
+                SCALER_MEAN = system['scaler'].mean_.astype(np.float64)
+                SCALER_INV_SCALE = (1.0 / system['scaler'].scale_).astype(np.float64)
+                SYSTEM = system
+    return SYSTEM
 
 def predict(input_data: dict) -> dict:
     """
@@ -44,10 +96,11 @@ def predict(input_data: dict) -> dict:
             "prediction": None
         }
     
+    import numpy as np
+    
     try:
         model = system['model']
         encoders = system['encoders']
-        scaler = system['scaler']
         feature_names = system['feature_names']
         
         # Map frontend field names to model feature names
@@ -77,12 +130,13 @@ def predict(input_data: dict) -> dict:
             'chronicDiarrhea': lambda v: 'Chronic' if v in ['Chronic', 'Yes', True] else 'No',
         }
         
-        # Create input DataFrame
-        input_df = pd.DataFrame(0, index=[0], columns=feature_names, dtype=float)
+        # Preallocated input row, filled by feature index
+        row = np.zeros(len(feature_names), dtype=np.float64)
         
         # Process input data
         for frontend_key, model_key in field_mapping.items():
-            if frontend_key in input_data and model_key in feature_names:
+            idx = FEATURE_INDEX.get(model_key)
+            if frontend_key in input_data and idx is not None:
                 value = input_data[frontend_key]
                 
                 # Apply value mapping if exists
@@ -90,45 +144,35 @@ def predict(input_data: dict) -> dict:
                     value = value_mapping[frontend_key](value)
                 
                 # Encode or use directly
-                if model_key in encoders:
-                    try:
-                        encoded_val = encoders[model_key].transform([value])[0]
-                        input_df.at[0, model_key] = float(encoded_val)
-                    except (ValueError, KeyError):
-                        input_df.at[0, model_key] = 0.0
+                if model_key in ENCODER_MAPS:
+                    row[idx] = ENCODER_MAPS[model_key].get(value, 0)
                 else:
                     try:
-                        input_df.at[0, model_key] = float(value) if value is not None else 0.0
+                        row[idx] = float(value) if value is not None else 0.0
                     except (ValueError, TypeError):
-                        input_df.at[0, model_key] = 0.0
+                        row[idx] = 0.0
         
-        # Scale features
-        input_scaled = pd.DataFrame(
-            scaler.transform(input_df),
-            columns=feature_names,
-            index=input_df.index
-        )
+        # Scale features inline; same result as scaler.transform, which warns
+        # about missing feature names when given a bare ndarray
+        input_scaled = ((row - SCALER_MEAN) * SCALER_INV_SCALE).astype(np.float32).reshape(1, -1)
         
         # Make prediction
-        pred_idx = model.predict(input_scaled)[0]
+        # One booster pass: the predicted class is the argmax of the probabilities
         pred_probs = model.predict_proba(input_scaled)[0]
+        pred_idx = int(np.argmax(pred_probs))
         
         # Decode prediction
         target_encoder = encoders['Diagnosis_Target']
-        diagnosis = target_encoder.inverse_transform([pred_idx])[0]
+        diagnosis = target_encoder.classes_[pred_idx]
         confidence = float(pred_probs[pred_idx] * 100)
         
         # Get all probabilities
         all_classes = target_encoder.classes_
-        probabilities = {cls: float(prob * 100) for cls, prob in zip(all_classes, pred_probs)}
+        probs_pct = np.round(pred_probs.astype(np.float64) * 100, 2)
+        probabilities = dict(zip(all_classes.tolist(), probs_pct.tolist()))
         
         # Determine risk level based on diagnosis
-        risk_levels = {
-            'Healthy': 'low',
-            'SCID_ADA': 'critical',
-            'SCID_X_Linked': 'critical',
-        }
-        risk_level = risk_levels.get(diagnosis, 'medium')
+        risk_level = RISK_LEVELS.get(diagnosis, 'medium')
         
         # Generate recommendations
         recommendations = generate_recommendations(diagnosis, confidence, input_data)
@@ -142,7 +186,7 @@ def predict(input_data: dict) -> dict:
                 "probabilities": probabilities,
                 "recommendations": recommendations,
                 "modelVersion": "1.0.0",
-                "timestamp": pd.Timestamp.now().isoformat()
+                "timestamp": datetime.now().isoformat()
             }
         }
         
@@ -156,27 +200,10 @@ def predict(input_data: dict) -> dict:
 
 def generate_recommendations(diagnosis: str, confidence: float, input_data: dict) -> list:
     """Generate clinical recommendations based on prediction."""
-    recommendations = []
-    
-    if diagnosis == 'Healthy':
-        recommendations.append("Continue routine monitoring and follow-up")
-        recommendations.append("Maintain current immunization schedule")
-        if confidence < 80:
-            recommendations.append("Consider additional testing to confirm healthy status")
-    
-    elif diagnosis == 'SCID_X_Linked':
-        recommendations.append("URGENT: Refer to pediatric immunologist immediately")
-        recommendations.append("Initiate protective isolation protocols")
-        recommendations.append("Genetic counseling for IL2RG mutation confirmation")
-        recommendations.append("Evaluate for bone marrow transplant eligibility")
-        recommendations.append("Avoid live vaccines until immune function is restored")
+    recommendations = list(RECOMMENDATIONS.get(diagnosis, ()))
     
-    elif diagnosis == 'SCID_ADA':
-        recommendations.append("URGENT: Refer to pediatric immunologist immediately")
-        recommendations.append("Consider ADA enzyme replacement therapy (PEG-ADA)")
-        recommendations.append("Genetic testing to confirm ADA gene mutation")
-        recommendations.append("Evaluate for gene therapy clinical trials")
-        recommendations.append("Initiate protective isolation protocols")
+    if diagnosis == 'Healthy' and confidence < 80:
+        recommendations.append("Consider additional testing to confirm healthy status")
     
     # Add general recommendations based on lab values
     if input_data.get('labALCLevel', 0) < 500:
@@ -3,30 +3,80 @@ ImmunoDetect ML API Service
 FastAPI wrapper for the XGBoost immunodeficiency prediction model
 """
 
-from fastapi import FastAPI, HTTPException, File, UploadFile, Depends
+import os
+
+# Cap the OpenMP/BLAS pools before NumPy and XGBoost are imported. Each pool
+# defaults to one thread per core, which oversubscribes the CPU as soon as
+# several server workers run side by side. Launch-time values take precedence.
+for _var in ('OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS'):
+    os.environ.setdefault(_var, '1')
+
+from fastapi import FastAPI, HTTPException, File, UploadFile, Depends, Header, Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, Field
-from typing import Optional, List, Dict, Any
-import pandas as pd
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+import msgspec
+import orjson
+from typing import Annotated, Optional, Dict, Any, Tuple
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
 import numpy as np
 import joblib
-import os
+import xgboost as xgb
+import asyncio
+import hashlib
+import hmac
+import json
+import math
+import re
 from datetime import datetime
 import logging
-import tempfile
-import shutil
+import io
+
+from model_artifacts import encoder_classes
+
+try:
+    from safetensors.numpy import load_file as load_safetensors
+except ImportError:  # Pickle-free artifacts are optional; fall back to joblib
+    load_safetensors = None
+
+try:
+    import polars as pl
+except ImportError:  # Polars is optional; fall back to pandas for CSV uploads
+    pl = None
+
+try:
+    from numba import njit
+except ImportError:  # Numba is optional; fall back to NumPy for input scaling
+    njit = None
+
+try:
+    import onnxruntime as ort
+except ImportError:  # ONNX Runtime is optional; fall back to XGBoost
+    ort = None
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+class ORJSONResponse(JSONResponse):
+    """JSON response rendered with orjson; NumPy arrays and scalars serialize natively"""
+    
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+
+
 # Initialize FastAPI app
 app = FastAPI(
     title="ImmunoDetect ML API",
     description="AI-powered immunodeficiency disease prediction service",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=ORJSONResponse
 )
 
 # CORS Configuration
@@ -44,70 +94,153 @@ app.add_middleware(
 
 # Model path
 MODEL_FILE = os.path.join(os.path.dirname(__file__), 'immunology_model.pkl')
+# Pickle-free artifacts written by export_artifacts.py
+BOOSTER_FILE = os.path.join(os.path.dirname(__file__), 'immunology_model.ubj')
+ARRAYS_FILE = os.path.join(os.path.dirname(__file__), 'immunology_model.safetensors')
+META_FILE = os.path.join(os.path.dirname(__file__), 'immunology_model.meta.json')
+ARTIFACTS_FORMAT_VERSION = 1
+ONNX_MODEL_FILE = os.path.join(os.path.dirname(__file__), 'immunology_model.onnx')
+ONNX_INTRA_OP_THREADS = int(os.getenv("ONNX_INTRA_OP_THREADS", "1"))
 SYSTEM = None
+MODEL_LOADING: Optional[asyncio.Task] = None
+
+# Number of distinct scaled feature vectors whose predictions are memoized
+PREDICTION_CACHE_SIZE = int(os.getenv("PREDICTION_CACHE_SIZE", "4096"))
+
+# Token for admin routes (X-Admin-Token header); they are disabled when unset
+ADMIN_TOKEN = os.getenv("ML_API_ADMIN_TOKEN")
+
+# Preallocated scaled-input buffers; about twice the expected in-flight requests
+PREDICT_BUFFER_POOL = int(os.getenv("PREDICT_BUFFER_POOL", "128"))
+
+# XGBoost threads for multi-row batches, sharing the cores between the server
+# workers (WEB_CONCURRENCY); single rows always use one thread
+SERVER_WORKERS = max(1, int(os.getenv("WEB_CONCURRENCY", "1")))
+BATCH_NTHREAD = max(1, min(4, (os.cpu_count() or 1) // SERVER_WORKERS))
+
+# All model calls go through one thread, so the booster's nthread can be
+# switched per call without racing
+PREDICT_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="predict")
 
 
 # ==========================================
-# PYDANTIC MODELS
+# REQUEST / RESPONSE MODELS
 # ==========================================
+# Prediction payloads are msgspec Structs: decoding and validating them is much
+# cheaper than Pydantic on the hot path. Constraints are declared with Meta.
 
-class PatientData(BaseModel):
+class PatientData(msgspec.Struct, frozen=True):
     """Patient demographics and clinical data"""
-    age_years: float = Field(..., ge=0, le=120, description="Patient age in years")
-    gender: str = Field(..., description="Patient gender (Male/Female)")
-    family_history: str = Field(default="No", description="Family history of immunodeficiency (Yes/No)")
-    consanguinity: str = Field(default="No", description="Consanguinity present (Yes/No)")
+    age_years: Annotated[float, msgspec.Meta(ge=0, le=120, description="Patient age in years")]
+    gender: Annotated[str, msgspec.Meta(description="Patient gender (Male/Female)")]
+    family_history: Annotated[str, msgspec.Meta(description="Family history of immunodeficiency (Yes/No)")] = "No"
+    consanguinity: Annotated[str, msgspec.Meta(description="Consanguinity present (Yes/No)")] = "No"
     
     # Clinical symptoms
-    infection_ear_freq: int = Field(default=0, ge=0, description="Frequency of ear infections")
-    infection_lung_freq: int = Field(default=0, ge=0, description="Frequency of lung infections")
-    persistent_thrush: str = Field(default="None", description="Thrush status (None/Occasional/Persistent)")
-    chronic_diarrhea: str = Field(default="None", description="Diarrhea status (None/Occasional/Chronic)")
-    failure_to_thrive: str = Field(default="No", description="Failure to thrive (Yes/No)")
-    history_iv_antibiotics: str = Field(default="No", description="History of IV antibiotics (Yes/No)")
+    infection_ear_freq: Annotated[int, msgspec.Meta(ge=0, description="Frequency of ear infections")] = 0
+    infection_lung_freq: Annotated[int, msgspec.Meta(ge=0, description="Frequency of lung infections")] = 0
+    persistent_thrush: Annotated[str, msgspec.Meta(description="Thrush status (None/Occasional/Persistent)")] = "None"
+    chronic_diarrhea: Annotated[str, msgspec.Meta(description="Diarrhea status (None/Occasional/Chronic)")] = "None"
+    failure_to_thrive: Annotated[str, msgspec.Meta(description="Failure to thrive (Yes/No)")] = "No"
+    history_iv_antibiotics: Annotated[str, msgspec.Meta(description="History of IV antibiotics (Yes/No)")] = "No"
     
     # Lab results
-    lab_alc_level: float = Field(default=1000, ge=0, description="Absolute lymphocyte count")
-    lab_igg_level: float = Field(default=700, ge=0, description="IgG level (mg/dL)")
+    lab_alc_level: Annotated[float, msgspec.Meta(ge=0, description="Absolute lymphocyte count")] = 1000
+    lab_igg_level: Annotated[float, msgspec.Meta(ge=0, description="IgG level (mg/dL)")] = 700
     
     # Optional primary gene
-    primary_gene_symbol: Optional[str] = Field(default=None, description="Primary gene of interest")
+    primary_gene_symbol: Annotated[Optional[str], msgspec.Meta(description="Primary gene of interest")] = None
 
 
-class GeneExpressionData(BaseModel):
+class GeneExpressionData(msgspec.Struct, frozen=True):
     """Gene expression data for prediction"""
-    cd3: float = Field(default=0, description="CD3+ T-cell count")
-    cd4: float = Field(default=0, description="CD4+ T-cell count")
-    cd8: float = Field(default=0, description="CD8+ T-cell count")
-    cd19: float = Field(default=0, description="CD19+ B-cell count")
-    cd56: float = Field(default=0, description="CD56+ NK cell count")
-    igG: float = Field(default=0, description="IgG level")
-    igA: float = Field(default=0, description="IgA level")
-    igM: float = Field(default=0, description="IgM level")
-    ada: float = Field(default=0, description="ADA enzyme activity")
-    pnp: float = Field(default=0, description="PNP enzyme activity")
+    cd3: Annotated[float, msgspec.Meta(description="CD3+ T-cell count")] = 0
+    cd4: Annotated[float, msgspec.Meta(description="CD4+ T-cell count")] = 0
+    cd8: Annotated[float, msgspec.Meta(description="CD8+ T-cell count")] = 0
+    cd19: Annotated[float, msgspec.Meta(description="CD19+ B-cell count")] = 0
+    cd56: Annotated[float, msgspec.Meta(description="CD56+ NK cell count")] = 0
+    igG: Annotated[float, msgspec.Meta(description="IgG level")] = 0
+    igA: Annotated[float, msgspec.Meta(description="IgA level")] = 0
+    igM: Annotated[float, msgspec.Meta(description="IgM level")] = 0
+    ada: Annotated[float, msgspec.Meta(description="ADA enzyme activity")] = 0
+    pnp: Annotated[float, msgspec.Meta(description="PNP enzyme activity")] = 0
     
     # Additional gene expression markers (optional)
     additional_markers: Optional[Dict[str, float]] = None
 
 
-class PredictionRequest(BaseModel):
+class PredictionRequest(msgspec.Struct, frozen=True):
     """Combined prediction request"""
     patient_data: PatientData
     gene_expression: Optional[GeneExpressionData] = None
 
 
-class PredictionResponse(BaseModel):
+class PredictionResponse(msgspec.Struct):
     """Prediction result"""
     success: bool
     diagnosis: str
-    confidence: float
+    confidence: float  # NumPy float32 scalar from the model, serialized natively by orjson
     risk_level: str
-    features_used: List[str]
-    feature_importance: Optional[Dict[str, float]] = None
-    model_version: str = "1.0.0"
+    features_used: Tuple[str, ...]
     predicted_at: datetime
     explanation: str
+    feature_importance: Optional[Dict[str, float]] = None
+    model_version: str = "1.0.0"
+
+
+PREDICTION_REQUEST_DECODER = msgspec.json.Decoder(PredictionRequest, strict=False)
+
+
+# OpenAPI schemas for the Structs, since /predict decodes the raw body itself.
+# Component schemas are added to the document in openapi() below.
+(PREDICTION_REQUEST_SCHEMA, PREDICTION_RESPONSE_SCHEMA), PREDICTION_SCHEMA_COMPONENTS = (
+    msgspec.json.schema_components(
+        (PredictionRequest, PredictionResponse), ref_template="#/components/schemas/{name}"
+    )
+)
+
+# One step of a msgspec error path such as `$.gene_expression.additional_markers[0]`
+_ERROR_PATH_STEP = re.compile(r"\.(\w+)|\[(\d+)\]")
+
+
+def request_validation_error(exc: Exception, body: bytes) -> RequestValidationError:
+    """Translate a msgspec decode failure into the error list FastAPI reports for Pydantic bodies"""
+    message = str(exc)
+    if not body:
+        return RequestValidationError([{'type': 'missing', 'loc': ('body',), 'msg': 'Field required', 'input': None}])
+    if isinstance(exc, msgspec.ValidationError):
+        message, _, path = message.partition(" - at `")
+        loc = ['body'] + [key or int(index) for key, index in _ERROR_PATH_STEP.findall(path)]
+        missing = re.match(r"Object missing required field `(\w+)`", message)
+        if missing:
+            return RequestValidationError([{
+                'type': 'missing', 'loc': tuple(loc + [missing.group(1)]), 'msg': 'Field required', 'input': None
+            }])
+        return RequestValidationError([{'type': 'value_error', 'loc': tuple(loc), 'msg': message, 'input': None}])
+    position = re.search(r"\(byte (\d+)\)", message)
+    return RequestValidationError([{
+        'type': 'json_invalid', 'loc': ('body', int(position.group(1)) if position else 0),
+        'msg': 'JSON decode error', 'input': {}, 'ctx': {'error': message}
+    }])
+
+
+def prediction_response(prediction: PredictionResponse) -> Response:
+    """Render a prediction with orjson, which writes NumPy scalars without a Python float cast"""
+    return ORJSONResponse(msgspec.structs.asdict(prediction))
+
+
+_fastapi_openapi = app.openapi
+
+
+def openapi() -> Dict[str, Any]:
+    """FastAPI's OpenAPI document plus the Struct schemas /predict refers to"""
+    if app.openapi_schema is None:
+        schema = _fastapi_openapi()
+        schema.setdefault("components", {}).setdefault("schemas", {}).update(PREDICTION_SCHEMA_COMPONENTS)
+    return app.openapi_schema
+
+
+app.openapi = openapi
 
 
 class HealthCheckResponse(BaseModel):
@@ -122,16 +255,24 @@ class HealthCheckResponse(BaseModel):
 # MODEL LOADING
 # ==========================================
 
-def load_model():
-    """Load the trained model artifacts"""
+def load_model(buffers: asyncio.Queue):
+    """Load the trained model artifacts; `buffers` receives the input buffer pool"""
     global SYSTEM
     
-    if not os.path.exists(MODEL_FILE):
+    if not os.path.exists(MODEL_FILE) and not os.path.exists(META_FILE):
         logger.warning(f"Model file not found at {MODEL_FILE}")
         return None
         
     try:
-        SYSTEM = joblib.load(MODEL_FILE)
+        if use_artifacts():
+            SYSTEM = prepare_system(load_artifacts(), buffers)
+            SYSTEM['model_version'] = f"{os.path.getmtime(META_FILE):.6f}"
+        else:
+            # Memory-map the pickled arrays so workers share them via the page cache
+            SYSTEM = prepare_system(unpack_pickle(joblib.load(MODEL_FILE, mmap_mode='r')), buffers)
+            SYSTEM['model_version'] = f"{os.path.getmtime(MODEL_FILE):.6f}"
+        SYSTEM['onnx_session'] = load_onnx_session(len(SYSTEM['feature_names']))
+        PREDICTION_CACHE.clear()
         logger.info("ML System loaded successfully")
         return SYSTEM
     except Exception as e:
@@ -139,11 +280,231 @@ def load_model():
         return None
 
 
-def get_model():
+def use_artifacts() -> bool:
+    """Whether the pickle-free artifacts exist, are loadable and not older than the pickle"""
+    if load_safetensors is None:
+        return False
+    if not all(os.path.exists(path) for path in (BOOSTER_FILE, ARRAYS_FILE, META_FILE)):
+        return False
+    if os.path.exists(MODEL_FILE) and os.path.getmtime(META_FILE) < os.path.getmtime(MODEL_FILE):
+        logger.warning(f"{META_FILE} is older than {MODEL_FILE}, loading the pickle")
+        return False
+    return True
+
+
+def load_artifacts() -> dict:
+    """Load the booster (UBJ), arrays (safetensors) and metadata (JSON) without unpickling"""
+    with open(META_FILE) as f:
+        meta = json.load(f)
+    if meta.get('format_version') != ARTIFACTS_FORMAT_VERSION:
+        raise ValueError(
+            f"Unsupported artifacts format {meta.get('format_version')}, "
+            f"expected {ARTIFACTS_FORMAT_VERSION}; re-run export_artifacts.py"
+        )
+    
+    arrays = load_safetensors(ARRAYS_FILE)
+    model = xgb.XGBClassifier()
+    model.load_model(BOOSTER_FILE)
+    
+    return {
+        'model': model,
+        'feature_names': meta['feature_names'],
+        'encoder_classes': meta['encoder_classes'],
+        'scaled_columns': meta['scaled_columns'],
+        'scaler_mean': arrays['scaler_mean'],
+        'scaler_scale': arrays['scaler_scale'],
+        'feature_importances': arrays['feature_importances'],
+        'model_params': meta['model_params'],
+    }
+
+
+def unpack_pickle(artifacts: dict) -> dict:
+    """Reduce the pickled training artifacts to the fields load_artifacts() provides"""
+    model = artifacts['model']
+    encoders = artifacts['encoders']
+    scaler = artifacts['scaler']
+    feature_names = list(artifacts['feature_names'])
+    
+    # Columns the scaler was fitted on, in its fit order
+    if hasattr(scaler, 'feature_names_in_'):
+        scaled_columns = list(scaler.feature_names_in_)
+    else:
+        scaled_columns = [col for col in feature_names if col not in encoders]
+    
+    return {
+        'model': model,
+        'feature_names': feature_names,
+        'encoder_classes': {
+            col: [str(cls) for cls in encoder_classes(enc)] for col, enc in encoders.items()
+        },
+        'scaled_columns': scaled_columns,
+        'scaler_mean': scaler.mean_,
+        'scaler_scale': scaler.scale_,
+        'feature_importances': getattr(model, 'feature_importances_', None),
+        'model_params': model.get_params() if hasattr(model, 'get_params') else {},
+    }
+
+
+def load_onnx_session(n_features: int):
+    """Open the exported ONNX model (see export_onnx.py) if it is usable"""
+    if ort is None or not os.path.exists(ONNX_MODEL_FILE):
+        return None
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    options.intra_op_num_threads = ONNX_INTRA_OP_THREADS
+    session = ort.InferenceSession(ONNX_MODEL_FILE, options, providers=['CPUExecutionProvider'])
+    if session.get_inputs()[0].shape[-1] != n_features:
+        logger.warning(f"{ONNX_MODEL_FILE} does not match the loaded model, using XGBoost")
+        return None
+    logger.info("Using ONNX Runtime for inference")
+    return session
+
+
+def prepare_system(system: dict, buffers: asyncio.Queue) -> dict:
+    """Precompute the index lookups used to build feature vectors"""
+    feature_names = system['feature_names']
+    encoder_classes = system['encoder_classes']
+    
+    feature_index = {name: i for i, name in enumerate(feature_names)}
+    system['feature_index'] = feature_index
+    system['encoder_idx'] = {col: feature_index[col] for col in encoder_classes if col in feature_index}
+    
+    # Gene symbol (e.g. IL2RG) -> index of its expression feature column
+    system['gene_feature_idx'] = {
+        name.replace('Gene_Exp_', '').replace('Control_Gene_', ''): idx
+        for name, idx in feature_index.items()
+        if name.startswith('Gene_Exp_') or name.startswith('Control_Gene_')
+    }
+    
+    # Category -> code lookups, replacing LabelEncoder.transform on the hot path
+    system['encoder_dicts'] = {
+        col: {cls: i for i, cls in enumerate(classes)}
+        for col, classes in encoder_classes.items()
+    }
+    system['target_classes'] = np.asarray(encoder_classes['Diagnosis_Target'])
+    system['n_classes'] = len(system['target_classes'])
+    system['risk_table'] = build_risk_table(system['target_classes'])
+    
+    # Input-independent response fields
+    system['feature_names_tuple'] = tuple(feature_names)
+    system['feature_importance_top10'] = None
+    if system['feature_importances'] is not None:
+        system['feature_importance_top10'] = dict(sorted(
+            ((name, float(imp)) for name, imp in zip(feature_names, system['feature_importances'])
+             if imp > 0.01),  # Only include significant features
+            key=lambda x: -x[1]
+        )[:10])
+    
+    build_static_responses(system)
+    
+    # Raw booster for inplace_predict; the sklearn wrapper is kept for /model-info.
+    # One thread per call: intra-op threading only slows down small batches.
+    xgb.set_config(verbosity=0)
+    system['booster'] = system['model'].get_booster()
+    system['booster'].set_param({'nthread': 1})
+    system['booster_nthread'] = 1
+    
+    system['scaled_idx'] = np.array(
+        [feature_index[col] for col in system['scaled_columns']], dtype=np.int64
+    )
+    
+    # Scaler parameters for a fused (x - mean) * inv_scale at predict time
+    system['scaler_mean'] = np.asarray(system['scaler_mean'], dtype=np.float64)
+    system['scaler_inv_scale'] = 1.0 / np.asarray(system['scaler_scale'], dtype=np.float64)
+    
+    # Compile (or load from cache) the scaling kernel now rather than on the first request
+    n_features = len(feature_names)
+    scale_row(np.zeros(n_features), system['scaled_idx'], system['scaler_mean'],
+              system['scaler_inv_scale'], np.empty(n_features, dtype=np.float32))
+    
+    # Preallocated input buffers: a zeroed raw row reused by prepare_input_data,
+    # and a pool of scaled (1, n_features) rows held by in-flight requests
+    system['scratch_row'] = np.zeros(n_features, dtype=np.float64)
+    # The queue is still private to this load, so filling it off the loop is safe
+    for _ in range(PREDICT_BUFFER_POOL):
+        buffers.put_nowait(np.zeros((1, n_features), dtype=np.float32))
+    system['buffers'] = buffers
+    
+    return system
+
+
+DISEASE_INFO = {
+    'SCID_X_Linked': {
+        'name': 'X-linked Severe Combined Immunodeficiency',
+        'gene': 'IL2RG',
+        'inheritance': 'X-linked recessive',
+        'description': 'Most common form of SCID, affecting T and NK cell development'
+    },
+    'SCID_ADA_Deficiency': {
+        'name': 'Adenosine Deaminase Deficiency',
+        'gene': 'ADA',
+        'inheritance': 'Autosomal recessive',
+        'description': 'Metabolic disorder causing accumulation of toxic metabolites'
+    },
+    'Healthy': {
+        'name': 'No Immunodeficiency Detected',
+        'gene': 'N/A',
+        'inheritance': 'N/A',
+        'description': 'Normal immune function indicators'
+    }
+}
+
+
+def serialize_json(content: dict) -> Tuple[bytes, str]:
+    """Serialize a static response body once and derive its ETag"""
+    body = json.dumps(jsonable_encoder(content), sort_keys=True).encode()
+    return body, hashlib.md5(body).hexdigest()
+
+
+def build_static_responses(system: dict):
+    """Prebuild the /model-info and /diseases bodies; they only change with the model"""
+    model = system['model']
+    classes = system['target_classes'].tolist()
+    
+    # get_params() contains NaN (e.g. `missing`), which is not valid JSON
+    params = {
+        key: None if isinstance(value, float) and not math.isfinite(value) else value
+        for key, value in system['model_params'].items()
+    }
+    
+    system['model_info_json'] = serialize_json({
+        "model_type": type(model).__name__,
+        "feature_count": len(system['feature_names']),
+        "features": system['feature_names'],
+        "target_classes": classes,
+        "model_params": params
+    })
+    system['diseases_json'] = serialize_json({
+        "detectable_conditions": classes,
+        "detailed_info": {
+            cls: DISEASE_INFO.get(cls, {'name': cls, 'description': 'Information not available'})
+            for cls in classes
+        }
+    })
+
+
+def cached_json_response(request: Request, body: bytes, etag: str) -> Response:
+    """Serve a prebuilt JSON body, answering 304 when the client's ETag matches"""
+    headers = {'ETag': f'"{etag}"', 'Cache-Control': 'public, max-age=300'}
+    if request.headers.get('if-none-match') == headers['ETag']:
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type='application/json', headers=headers)
+
+
+async def load_model_async():
+    """Load the model in a worker thread. The buffer queue is created here, on
+    the event loop: before Python 3.10 asyncio.Queue() binds to the current
+    thread's loop and fails in a worker thread."""
+    return await asyncio.to_thread(load_model, asyncio.Queue())
+
+
+async def get_model():
     """Dependency to ensure model is loaded"""
     global SYSTEM
+    if SYSTEM is None and MODEL_LOADING is not None:
+        await asyncio.shield(MODEL_LOADING)
     if SYSTEM is None:
-        SYSTEM = load_model()
+        SYSTEM = await load_model_async()
     if SYSTEM is None:
         raise HTTPException(
             status_code=503,
@@ -173,48 +534,103 @@ def calculate_risk_level(confidence: float, diagnosis: str) -> str:
         return 'LOW'
 
 
-def generate_explanation(diagnosis: str, confidence: float, risk_level: str) -> str:
-    """Generate human-readable explanation of prediction"""
-    explanations = {
-        'SCID_X_Linked': (
-            "X-linked Severe Combined Immunodeficiency (SCID-X1) is indicated. "
-            "This condition is caused by mutations in the IL2RG gene affecting T and NK cell development. "
-            "Immediate consultation with an immunologist is recommended."
-        ),
-        'SCID_ADA_Deficiency': (
-            "Adenosine Deaminase (ADA) deficiency is indicated. "
-            "This metabolic disorder affects lymphocyte development and survival. "
-            "Enzyme replacement therapy or gene therapy may be treatment options."
-        ),
-        'Healthy': (
-            "Analysis suggests normal immune function. "
-            "No significant indicators of primary immunodeficiency were detected. "
-            "Continue routine monitoring as recommended by your healthcare provider."
-        ),
-    }
-    
-    base_explanation = explanations.get(diagnosis, 
-        f"The analysis indicates {diagnosis}. Please consult with a specialist for confirmation.")
-    
-    confidence_note = f"\n\nPrediction confidence: {confidence:.1%}. "
-    if confidence < 0.7:
-        confidence_note += "Due to moderate confidence, clinical correlation is strongly recommended."
-    
-    risk_note = f"Risk assessment: {risk_level}."
-    
-    return base_explanation + confidence_note + risk_note
+EXPLANATIONS = {
+    'SCID_X_Linked': (
+        "X-linked Severe Combined Immunodeficiency (SCID-X1) is indicated. "
+        "This condition is caused by mutations in the IL2RG gene affecting T and NK cell development. "
+        "Immediate consultation with an immunologist is recommended."
+    ),
+    'SCID_ADA_Deficiency': (
+        "Adenosine Deaminase (ADA) deficiency is indicated. "
+        "This metabolic disorder affects lymphocyte development and survival. "
+        "Enzyme replacement therapy or gene therapy may be treatment options."
+    ),
+    'Healthy': (
+        "Analysis suggests normal immune function. "
+        "No significant indicators of primary immunodeficiency were detected. "
+        "Continue routine monitoring as recommended by your healthcare provider."
+    ),
+}
 
+MODERATE_CONFIDENCE_NOTE = "Due to moderate confidence, clinical correlation is strongly recommended."
 
-def prepare_input_data(patient_data: PatientData, gene_expression: Optional[GeneExpressionData], system: dict) -> pd.DataFrame:
-    """Prepare input data for model prediction"""
-    feature_names = system['feature_names']
-    encoders = system['encoders']
-    scaler = system['scaler']
+# Lower confidence bound of each risk bucket (<0.5, 0.5-0.7, 0.7-0.85, 0.85+)
+CONFIDENCE_BUCKET_FLOORS = (0.0, 0.5, 0.7, 0.85)
+
+
+def confidence_bucket(confidence: float) -> int:
+    """Index into CONFIDENCE_BUCKET_FLOORS"""
+    return 0 if confidence < 0.5 else 1 if confidence < 0.7 else 2 if confidence < 0.85 else 3
+
+
+def build_risk_table(target_classes: np.ndarray) -> Dict[Tuple[int, int], Tuple[str, str, str]]:
+    """
+    Precompute (risk_level, explanation prefix, explanation suffix) per
+    (class index, confidence bucket); the confidence is formatted in between
+    """
+    risk_table = {}
+    for class_idx, diagnosis in enumerate(target_classes.tolist()):
+        base_explanation = EXPLANATIONS.get(diagnosis, 
+            f"The analysis indicates {diagnosis}. Please consult with a specialist for confirmation.")
+        for bucket, floor in enumerate(CONFIDENCE_BUCKET_FLOORS):
+            risk_level = calculate_risk_level(floor, diagnosis)
+            note = MODERATE_CONFIDENCE_NOTE if floor < 0.7 else ""
+            risk_table[(class_idx, bucket)] = (
+                risk_level,
+                base_explanation + "\n\nPrediction confidence: ",
+                f". {note}Risk assessment: {risk_level}."
+            )
+    return risk_table
+
+
+def generate_explanation(system: dict, class_idx: int, confidence: float) -> Tuple[str, str]:
+    """Risk level and human-readable explanation of a prediction, from the risk table"""
+    risk_level, prefix, suffix = system['risk_table'][(class_idx, confidence_bucket(confidence))]
+    return risk_level, f"{prefix}{confidence:.1%}{suffix}"
+
+
+def prepare_input_data(
+    patient_data: PatientData,
+    gene_expression: Optional[GeneExpressionData],
+    system: dict,
+    out: np.ndarray,
+    feature_values: Optional[Dict[int, float]] = None
+) -> np.ndarray:
+    """
+    Prepare input data for model prediction as a scaled (1, n_features) array in `out`.
+    `feature_values` maps feature indices to raw values written after the request fields.
+    """
+    feature_index = system['feature_index']
+    encoder_dicts = system['encoder_dicts']
     
-    # Initialize DataFrame with zeros
-    input_df = pd.DataFrame(columns=feature_names)
-    input_df.loc[0] = 0
+    # Raw feature vector, written by column index. The scratch row stays zeroed
+    # between requests: only the entries written here are reset afterwards.
+    arr = system['scratch_row']
+    touched = []
+    try:
+        fill_raw_features(arr, touched, patient_data, gene_expression, feature_index, encoder_dicts)
+        if feature_values:
+            for idx, value in feature_values.items():
+                arr[idx] = value
+                touched.append(idx)
+        
+        # Scale the columns the scaler was fitted on
+        scale_row(arr, system['scaled_idx'], system['scaler_mean'], system['scaler_inv_scale'], out[0])
+    finally:
+        arr[touched] = 0.0
     
+    return out
+
+
+def fill_raw_features(
+    arr: np.ndarray,
+    touched: list,
+    patient_data: PatientData,
+    gene_expression: Optional[GeneExpressionData],
+    feature_index: Dict[str, int],
+    encoder_dicts: Dict[str, Dict[str, int]]
+):
+    """Write the unscaled request values into `arr`, recording each index written"""
     # Map patient data to model features
     field_mapping = {
         'Age_Years': patient_data.age_years,
@@ -236,16 +652,18 @@ def prepare_input_data(patient_data: PatientData, gene_expression: Optional[Gene
     
     # Apply field mapping
     for col, value in field_mapping.items():
-        if col in feature_names:
-            if col in encoders:
-                try:
-                    encoded_val = encoders[col].transform([value])[0]
-                    input_df.at[0, col] = encoded_val
-                except ValueError:
+        idx = feature_index.get(col)
+        if idx is not None:
+            lookup = encoder_dicts.get(col)
+            if lookup is not None:
+                code = lookup.get(value)
+                if code is None:
                     logger.warning(f"Unknown category '{value}' for {col}, using default")
-                    input_df.at[0, col] = 0
+                    code = 0
+                arr[idx] = code
             else:
-                input_df.at[0, col] = value
+                arr[idx] = value
+            touched.append(idx)
     
     # Add gene expression data if provided
     if gene_expression:
@@ -263,23 +681,156 @@ def prepare_input_data(patient_data: PatientData, gene_expression: Optional[Gene
         }
         
         for col, value in gene_mapping.items():
-            if col in feature_names:
-                input_df.at[0, col] = value
+            idx = feature_index.get(col)
+            if idx is not None:
+                arr[idx] = value
+                touched.append(idx)
         
         # Additional markers
         if gene_expression.additional_markers:
             for marker, value in gene_expression.additional_markers.items():
-                if marker in feature_names:
-                    input_df.at[0, marker] = value
+                idx = feature_index.get(marker)
+                if idx is not None:
+                    arr[idx] = value
+                    touched.append(idx)
+
+
+def _scale_row(row, scaled_idx, mean, inv_scale, out):
+    """Copy a float64 row into float32 `out`, applying (x - mean) * inv_scale to the scaled columns"""
+    for i in range(row.shape[0]):
+        out[i] = row[i]
+    for j in range(scaled_idx.shape[0]):
+        k = scaled_idx[j]
+        out[k] = (row[k] - mean[j]) * inv_scale[j]
+
+
+def _scale_row_numpy(row, scaled_idx, mean, inv_scale, out):
+    """NumPy equivalent of _scale_row when Numba is not installed"""
+    num = row[scaled_idx]
+    num -= mean
+    num *= inv_scale
+    out[:] = row
+    out[scaled_idx] = num
+
+
+scale_row = njit(cache=True, nogil=True)(_scale_row) if njit is not None else _scale_row_numpy
+
+
+def predict_proba(X: np.ndarray) -> np.ndarray:
+    """Class probabilities (n, n_classes) for scaled rows (ONNX Runtime, else XGBoost)"""
+    X = np.ascontiguousarray(X, dtype=np.float32)
+    session = SYSTEM.get('onnx_session')
+    if session is not None:
+        return session.run(None, {'input': X})[1]
+    booster = SYSTEM['booster']
+    nthread = 1 if len(X) == 1 else BATCH_NTHREAD
+    if SYSTEM['booster_nthread'] != nthread:
+        booster.set_param({'nthread': nthread})
+        SYSTEM['booster_nthread'] = nthread
+    # inplace_predict skips DMatrix construction
+    return booster.inplace_predict(X).reshape(len(X), SYSTEM['n_classes'])
+
+
+class PredictionCache:
+    """LRU of (pred_idx, float32 probability bytes) keyed on scaled feature bytes + model version"""
+    
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[Tuple[bytes, str], Tuple[int, bytes]]" = OrderedDict()
+    
+    def get(self, key: Tuple[bytes, str]) -> Optional[Tuple[int, bytes]]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
     
-    # Scale numerical features
-    numerical_cols = [col for col in feature_names if col not in encoders]
-    input_df[numerical_cols] = scaler.transform(input_df[numerical_cols])
+    def put(self, key: Tuple[bytes, str], value: Tuple[int, bytes]):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
     
-    # Ensure correct column order
-    input_df = input_df[feature_names]
+    def clear(self) -> int:
+        count = len(self._entries)
+        self._entries.clear()
+        return count
+
+
+class Batcher:
+    """Collects single-row predict requests and scores them in one predict_proba call"""
+    
+    def __init__(self, max_batch: int = 64, max_wait_ms: float = 5.0):
+        self.max_batch = max_batch
+        self.max_wait_ms = max_wait_ms
+        self.queue: Optional[asyncio.Queue] = None
+        self.task: Optional[asyncio.Task] = None
+    
+    def start(self):
+        self.queue = asyncio.Queue()
+        self.task = asyncio.create_task(self._run())
+    
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+    
+    async def submit(self, vec: np.ndarray) -> np.ndarray:
+        """Queue a scaled (1, n_features) vector and wait for its probability row"""
+        if self.task is None:
+            return predict_proba(vec)[0]
+        fut = asyncio.get_running_loop().create_future()
+        await self.queue.put((vec, fut))
+        return await fut
     
-    return input_df
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            items = [await self.queue.get()]
+            deadline = loop.time() + self.max_wait_ms / 1000
+            while len(items) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    items.append(await asyncio.wait_for(self.queue.get(), timeout=timeout))
+                except asyncio.TimeoutError:
+                    break
+            
+            stacked = np.vstack([vec for vec, _ in items])
+            try:
+                probs = await loop.run_in_executor(PREDICT_EXECUTOR, predict_proba, stacked)
+            except Exception as e:
+                for _, fut in items:
+                    if not fut.done():
+                        fut.set_exception(e)
+                continue
+            
+            for (_, fut), row in zip(items, probs):
+                if not fut.done():
+                    fut.set_result(row)
+
+
+PREDICTION_CACHE = PredictionCache(PREDICTION_CACHE_SIZE)
+BATCHER = Batcher(
+    max_batch=int(os.getenv("PREDICT_MAX_BATCH", "64")),
+    max_wait_ms=float(os.getenv("PREDICT_MAX_WAIT_MS", "5"))
+)
+
+
+async def run_prediction(input_arr: np.ndarray, system: dict) -> Tuple[int, np.ndarray]:
+    """Predict class index and probabilities for a scaled (1, n_features) array"""
+    key = (np.ascontiguousarray(input_arr, dtype=np.float32).tobytes(), system['model_version'])
+    cached = PREDICTION_CACHE.get(key)
+    if cached is None:
+        pred_probs = await BATCHER.submit(input_arr)
+        cached = (int(np.argmax(pred_probs)), pred_probs.astype(np.float32).tobytes())
+        PREDICTION_CACHE.put(key, cached)
+    pred_idx, probs_bytes = cached
+    return pred_idx, np.frombuffer(probs_bytes, dtype=np.float32)
 
 
 # ==========================================
@@ -288,8 +839,17 @@ def prepare_input_data(patient_data: PatientData, gene_expression: Optional[Gene
 
 @app.on_event("startup")
 async def startup_event():
-    """Load model on startup"""
-    load_model()
+    """Load model (in a worker thread) and start the prediction batcher on startup"""
+    global MODEL_LOADING
+    # /health answers while the model loads; prediction routes wait for it
+    MODEL_LOADING = asyncio.create_task(load_model_async())
+    BATCHER.start()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop the prediction batcher"""
+    await BATCHER.stop()
 
 
 @app.get("/", response_model=dict)
@@ -314,56 +874,74 @@ async def health_check():
     )
 
 
-@app.post("/predict", response_model=PredictionResponse)
-async def predict(request: PredictionRequest, system: dict = Depends(get_model)):
+@app.post(
+    "/predict",
+    openapi_extra={
+        "requestBody": {"required": True, "content": {"application/json": {"schema": PREDICTION_REQUEST_SCHEMA}}},
+        "responses": {
+            "200": {"content": {"application/json": {"schema": PREDICTION_RESPONSE_SCHEMA}}},
+            "422": {
+                "description": "Validation Error",
+                "content": {"application/json": {"schema": {"$ref": "#/components/schemas/HTTPValidationError"}}},
+            },
+        },
+    },
+)
+async def predict(request: Request, system: dict = Depends(get_model)):
     """
     Make a prediction based on patient data and optional gene expression
     """
+    body = await request.body()
     try:
-        # Prepare input data
-        input_df = prepare_input_data(request.patient_data, request.gene_expression, system)
-        
-        model = system['model']
-        encoders = system['encoders']
-        target_encoder = encoders['Diagnosis_Target']
-        
-        # Make prediction
-        pred_idx = model.predict(input_df)[0]
-        pred_probs = model.predict_proba(input_df)[0]
+        prediction_request = PREDICTION_REQUEST_DECODER.decode(body)
+    except (msgspec.ValidationError, msgspec.DecodeError) as e:
+        raise request_validation_error(e, body)
+    
+    return prediction_response(await make_prediction(prediction_request, system))
+
+
+@asynccontextmanager
+async def input_buffer(system: dict):
+    """Borrow a pooled (1, n_features) input row until the model has run on it"""
+    buffers = system['buffers']
+    input_arr = await buffers.get()
+    try:
+        yield input_arr
+    finally:
+        buffers.put_nowait(input_arr)
+
+
+async def make_prediction(request: PredictionRequest, system: dict) -> PredictionResponse:
+    """Run a decoded prediction request through the model"""
+    async with input_buffer(system) as input_arr:
+        try:
+            prepare_input_data(request.patient_data, request.gene_expression, system, input_arr)
+        except Exception as e:
+            logger.error(f"Prediction error: {e}")
+            raise HTTPException(status_code=500, detail=f"Prediction failed: {str(e)}")
+        return await _run_prediction(input_arr, system)
+
+
+async def _run_prediction(input_arr: np.ndarray, system: dict) -> PredictionResponse:
+    """Predict on a prepared, scaled (1, n_features) row and build the response"""
+    try:
+        # Make prediction (repeated inputs are served from the cache)
+        pred_idx, pred_probs = await run_prediction(input_arr, system)
         
         # Decode prediction
-        diagnosis = target_encoder.inverse_transform([pred_idx])[0]
-        confidence = float(pred_probs[pred_idx])
+        diagnosis = str(system['target_classes'][pred_idx])
+        confidence = pred_probs[pred_idx]
         
-        # Calculate risk level
-        risk_level = calculate_risk_level(confidence, diagnosis)
-        
-        # Get feature importance (if available)
-        feature_importance = None
-        if hasattr(model, 'feature_importances_'):
-            importances = model.feature_importances_
-            feature_importance = {
-                name: float(imp) 
-                for name, imp in zip(system['feature_names'], importances)
-                if imp > 0.01  # Only include significant features
-            }
-            # Sort by importance
-            feature_importance = dict(sorted(
-                feature_importance.items(), 
-                key=lambda x: x[1], 
-                reverse=True
-            )[:10])  # Top 10 features
-        
-        # Generate explanation
-        explanation = generate_explanation(diagnosis, confidence, risk_level)
+        # Risk level and explanation text from the precomputed table
+        risk_level, explanation = generate_explanation(system, pred_idx, confidence)
         
         return PredictionResponse(
             success=True,
             diagnosis=diagnosis,
             confidence=confidence * 100,  # Convert to percentage
             risk_level=risk_level,
-            features_used=system['feature_names'],
-            feature_importance=feature_importance,
+            features_used=system['feature_names_tuple'],
+            feature_importance=system['feature_importance_top10'],
             predicted_at=datetime.now(),
             explanation=explanation
         )
@@ -373,6 +951,23 @@ async def predict(request: PredictionRequest, system: dict = Depends(get_model))
         raise HTTPException(status_code=500, detail=f"Prediction failed: {str(e)}")
 
 
+def read_gene_csv(data: bytes) -> Tuple[list, list]:
+    """Parse the first two columns (gene symbol, float32 value) of an uploaded CSV"""
+    if pl is not None:
+        gene_df = pl.read_csv(
+            io.BytesIO(data), has_header=True, columns=[0, 1],
+            schema_overrides=[pl.String, pl.Float32]
+        )
+        return gene_df.to_series(0).to_list(), gene_df.to_series(1).to_list()
+    
+    import pandas as pd
+    gene_df = pd.read_csv(
+        io.BytesIO(data), header=0, usecols=[0, 1],
+        dtype={0: str, 1: np.float32}, engine='c'
+    )
+    return gene_df.iloc[:, 0].tolist(), gene_df.iloc[:, 1].tolist()
+
+
 @app.post("/predict-from-csv")
 async def predict_from_csv(
     age_years: float,
@@ -385,103 +980,52 @@ async def predict_from_csv(
     Make prediction using uploaded CSV file with gene expression data
     """
     try:
-        # Save uploaded file temporarily
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.csv') as tmp:
-            shutil.copyfileobj(gene_csv.file, tmp)
-            tmp_path = tmp.name
-        
-        # Read gene expression from CSV
-        gene_df = pd.read_csv(tmp_path)
-        gene_map = dict(zip(gene_df.iloc[:, 0], gene_df.iloc[:, 1]))
+        # Parse the upload in memory: gene symbol, expression value
+        symbols, values = read_gene_csv(await gene_csv.read())
+        gene_feature_idx = system['gene_feature_idx']
+        gene_values = {
+            gene_feature_idx[symbol]: value
+            for symbol, value in zip(symbols, values)
+            if symbol in gene_feature_idx
+        }
         
-        # Create patient data
+        # Unspecified clinical fields take the PatientData defaults
         patient_data = PatientData(
             age_years=age_years,
             gender=gender,
             family_history=family_history
         )
         
-        # Create gene expression data from CSV
-        gene_expression = GeneExpressionData(
-            cd3=gene_map.get('CD3', 0),
-            cd4=gene_map.get('CD4', 0),
-            cd8=gene_map.get('CD8', 0),
-            cd19=gene_map.get('CD19', 0),
-            cd56=gene_map.get('CD56', 0),
-            igG=gene_map.get('IgG', gene_map.get('IGG', 0)),
-            igA=gene_map.get('IgA', gene_map.get('IGA', 0)),
-            igM=gene_map.get('IgM', gene_map.get('IGM', 0)),
-            ada=gene_map.get('ADA', 0),
-            pnp=gene_map.get('PNP', 0),
-            additional_markers={k: v for k, v in gene_map.items() 
-                               if k not in ['CD3', 'CD4', 'CD8', 'CD19', 'CD56', 
-                                           'IgG', 'IgA', 'IgM', 'ADA', 'PNP']}
-        )
-        
-        # Clean up temp file
-        os.unlink(tmp_path)
-        
-        # Make prediction
-        request = PredictionRequest(
-            patient_data=patient_data,
-            gene_expression=gene_expression
-        )
-        
-        return await predict(request, system)
+        # Build the feature vector directly and run it through the shared pipeline
+        async with input_buffer(system) as input_arr:
+            prepare_input_data(patient_data, None, system, input_arr, feature_values=gene_values)
+            return prediction_response(await _run_prediction(input_arr, system))
         
     except Exception as e:
         logger.error(f"CSV prediction error: {e}")
         raise HTTPException(status_code=500, detail=f"Prediction failed: {str(e)}")
 
 
+@app.post("/cache/clear")
+async def clear_prediction_cache(x_admin_token: Optional[str] = Header(None)):
+    """Drop all memoized predictions (admin only; disabled unless ML_API_ADMIN_TOKEN is set)"""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if x_admin_token is None or not hmac.compare_digest(x_admin_token.encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+    return {"success": True, "cleared_entries": PREDICTION_CACHE.clear()}
+
+
 @app.get("/model-info")
-async def model_info(system: dict = Depends(get_model)):
+async def model_info(request: Request, system: dict = Depends(get_model)):
     """Get information about the loaded model"""
-    model = system['model']
-    target_encoder = system['encoders']['Diagnosis_Target']
-    
-    return {
-        "model_type": type(model).__name__,
-        "feature_count": len(system['feature_names']),
-        "features": system['feature_names'],
-        "target_classes": list(target_encoder.classes_),
-        "model_params": model.get_params() if hasattr(model, 'get_params') else {}
-    }
+    return cached_json_response(request, *system['model_info_json'])
 
 
 @app.get("/diseases")
-async def get_diseases(system: dict = Depends(get_model)):
+async def get_diseases(request: Request, system: dict = Depends(get_model)):
     """Get list of detectable diseases"""
-    target_encoder = system['encoders']['Diagnosis_Target']
-    
-    disease_info = {
-        'SCID_X_Linked': {
-            'name': 'X-linked Severe Combined Immunodeficiency',
-            'gene': 'IL2RG',
-            'inheritance': 'X-linked recessive',
-            'description': 'Most common form of SCID, affecting T and NK cell development'
-        },
-        'SCID_ADA_Deficiency': {
-            'name': 'Adenosine Deaminase Deficiency',
-            'gene': 'ADA',
-            'inheritance': 'Autosomal recessive',
-            'description': 'Metabolic disorder causing accumulation of toxic metabolites'
-        },
-        'Healthy': {
-            'name': 'No Immunodeficiency Detected',
-            'gene': 'N/A',
-            'inheritance': 'N/A',
-            'description': 'Normal immune function indicators'
-        }
-    }
-    
-    return {
-        "detectable_conditions": list(target_encoder.classes_),
-        "detailed_info": {
-            cls: disease_info.get(cls, {'name': cls, 'description': 'Information not available'})
-            for cls in target_encoder.classes_
-        }
-    }
+    return cached_json_response(request, *system['diseases_json'])
 
 
 # ==========================================
@@ -0,0 +1,21 @@
+"""
+Helpers shared by the scripts and APIs that read the trained artifacts
+(immunology_model.pkl and the files exported from it).
+"""
+
+
+def encoder_classes(encoder):
+    """
+    Categories of a saved encoder, in code order.
+    Feature encoders are category Indexes (position = code); older artifacts
+    and the target use LabelEncoder.classes_.
+    """
+    return getattr(encoder, 'classes_', encoder)
+
+
+def build_encoder_maps(encoders):
+    """Category -> code lookup for every encoded column"""
+    return {
+        col: {cls: i for i, cls in enumerate(encoder_classes(enc))}
+        for col, enc in encoders.items()
+    }
@@ -2,6 +2,8 @@ import pandas as pd
 import numpy as np
 import joblib
 
+from model_artifacts import build_encoder_maps
+
 # Load the trained artifacts
 MODEL_FILE = 'immunology_model.pkl'
 
@@ -10,6 +12,11 @@ def load_system():
     print("Loading AI System...")
     try:
         artifacts = joblib.load(MODEL_FILE)
+        artifacts['feature_index'] = {name: i for i, name in enumerate(artifacts['feature_names'])}
+        artifacts['encoder_maps'] = build_encoder_maps(artifacts['encoders'])
+        # Scaler parameters for scaling the input row inline
+        artifacts['scaler_mean'] = artifacts['scaler'].mean_.astype(np.float64)
+        artifacts['scaler_inv_scale'] = (1.0 / artifacts['scaler'].scale_).astype(np.float64)
         return artifacts
     except FileNotFoundError:
         print(f"Error: '{MODEL_FILE}' not found. Please run 'train_model.py' first!")
@@ -62,32 +69,33 @@ def predict_patient_status(manual_data, gene_csv_path=None):
     
     model = SYSTEM['model']
     encoders = SYSTEM['encoders']
-    scaler = SYSTEM['scaler']
     feature_names = SYSTEM['feature_names']
+    feature_index = SYSTEM['feature_index']
+    encoder_maps = SYSTEM['encoder_maps']
     
     # ==========================================
     # STEP 1: PREPARE DATA CONTAINER
     # ==========================================
-    # Create a single-row DataFrame with proper dtypes
-    input_df = pd.DataFrame(0, index=[0], columns=feature_names, dtype=float) 
+    # A single feature vector, written by column index
+    arr = np.zeros(len(feature_names), dtype=np.float64)
     
     # ==========================================
     # STEP 2: PROCESS MANUAL INPUTS
     # ==========================================
     for col, value in manual_data.items():
-        if col in feature_names:
+        idx = feature_index.get(col)
+        if idx is not None:
             # Check if this column needs encoding (Male -> 1)
-            if col in encoders:
-                try:
-                    # Transform the single value using the saved encoder
-                    encoded_val = encoders[col].transform([value])[0]
-                    input_df.at[0, col] = float(encoded_val)
-                except ValueError:
+            if col in encoder_maps:
+                # Look up the code the saved encoder assigned to this value
+                code = encoder_maps[col].get(value)
+                if code is None:
                     print(f"Warning: Unknown category '{value}' for {col}. Using default.")
-                    input_df.at[0, col] = 0.0
+                    code = 0
+                arr[idx] = code
             else:
                 # Numerical value (Age, etc.)
-                input_df.at[0, col] = float(value)
+                arr[idx] = float(value)
 
     # ==========================================
     # STEP 3: PROCESS CSV FILE (GENE EXPRESSION)
@@ -106,7 +114,7 @@ def predict_patient_status(manual_data, gene_csv_path=None):
                     clean_name = feature.replace("Gene_Exp_", "").replace("Control_Gene_", "")
                     
                     if clean_name in gene_map:
-                        input_df.at[0, feature] = float(gene_map[clean_name])
+                        arr[feature_index[feature]] = float(gene_map[clean_name])
                         
         except Exception as e:
             print(f"Error reading CSV: {e}")
@@ -115,22 +123,16 @@ def predict_patient_status(manual_data, gene_csv_path=None):
     # STEP 4: SCALING (CRITICAL UPDATE)
     # ==========================================
     # The scaler was fitted on ALL features during training (after encoding)
-    # So we must transform ALL features in the same order
-    input_df_scaled = pd.DataFrame(
-        scaler.transform(input_df),
-        columns=feature_names,
-        index=input_df.index
-    )
+    # So we must transform ALL features in the same order. The stored mean/scale
+    # are applied directly; scaler.transform would warn about the unnamed ndarray
+    input_scaled = ((arr - SYSTEM['scaler_mean']) * SYSTEM['scaler_inv_scale']).astype(np.float32).reshape(1, -1)
 
     # ==========================================
     # STEP 5: PREDICTION
     # ==========================================
-    # Use the scaled dataframe for prediction
-    input_df = input_df_scaled[feature_names]
-    
     # Predict Class
-    pred_idx = model.predict(input_df_scaled)[0]
-    pred_probs = model.predict_proba(input_df_scaled)[0]
+    pred_idx = model.predict(input_scaled)[0]
+    pred_probs = model.predict_proba(input_scaled)[0]
     
     # Decode Class (0 -> "SCID_X_Linked")
     target_encoder = encoders['Diagnosis_Target']
@@ -0,0 +1,61 @@
+"""
+Tests for the Flask prediction API (api.py).
+Run from ai/counselors after train_model.py has written immunology_model.pkl:
+    python -m pytest -q test_api.py
+"""
+
+import os
+
+import pytest
+
+import api
+
+pytestmark = pytest.mark.skipif(
+    not os.path.exists(api.MODEL_FILE), reason="immunology_model.pkl not trained"
+)
+
+BASE_PATIENT = {
+    'ageYears': 0.5,
+    'gender': 'Male',
+    'infectionEarFreq': 8,
+    'infectionLungFreq': 4,
+    'labALCLevel': 450,
+    'labIgGLevel': 150,
+}
+
+
+@pytest.fixture(scope="module")
+def client():
+    assert api.load_system()
+    return api.app.test_client()
+
+
+def post_predict(client, **fields):
+    response = client.post('/predict', json={'patientData': {**BASE_PATIENT, **fields}})
+    assert response.status_code == 200
+    return response.get_json()['prediction']
+
+
+def test_backend_values_are_normalized(client):
+    """'Mild' symptoms and string/int booleans from the backend hit the right classes."""
+    raw = post_predict(
+        client,
+        persistentThrush='Mild', chronicDiarrhea='Mild',
+        familyHistory='true', consanguinity='false',
+        failureToThrive=1, historyIVAntibiotics=0,
+    )
+    normalized = post_predict(
+        client,
+        persistentThrush='No', chronicDiarrhea='No',
+        familyHistory='Yes', consanguinity='No',
+        failureToThrive='Yes', historyIVAntibiotics='No',
+    )
+    assert raw['allProbabilities'] == normalized['allProbabilities']
+
+
+def test_mild_diarrhea_is_not_encoded_as_chronic(client):
+    row = api.fill_feature_row(
+        [0.0] * len(api.SYSTEM['feature_names']), {'chronicDiarrhea': 'Mild'}
+    )
+    idx = api.FEATURE_INDEX['Chronic_Diarrhea']
+    assert row[idx] == api.ENCODER_MAPS['Chronic_Diarrhea']['No']
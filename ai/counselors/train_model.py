@@ -1,14 +1,15 @@
+import os
+import hashlib
 import pandas as pd
 import numpy as np
 import xgboost as xgb
-from sklearn.model_selection import StratifiedKFold, RandomizedSearchCV, train_test_split
+from sklearn.model_selection import StratifiedKFold, ParameterSampler, train_test_split
 from sklearn.preprocessing import LabelEncoder, StandardScaler
 from sklearn.metrics import (
-    classification_report, confusion_matrix, accuracy_score, balanced_accuracy_score,
-    roc_auc_score, log_loss, matthews_corrcoef, cohen_kappa_score, brier_score_loss,
-    silhouette_score, davies_bouldin_score, calinski_harabasz_score, f1_score
+    classification_report, confusion_matrix, roc_auc_score, log_loss,
+    silhouette_score, davies_bouldin_score, calinski_harabasz_score
 )
-from sklearn.utils.class_weight import compute_sample_weight
+from scipy.stats import loguniform, randint, uniform
 import joblib
 
 # ==========================================
@@ -17,56 +18,291 @@ import joblib
 DATA_FILE = 'immunogenomics_dataset.csv'
 MODEL_FILE = 'immunology_model.pkl'
 
-def train_robust_model():
-    print("--- 1. Loading and Inspecting Data ---")
-    try:
-        df = pd.read_csv(DATA_FILE)
-    except FileNotFoundError:
-        print(f"Error: {DATA_FILE} not found.")
-        return
+# Preprocessed training data is cached in prep_<hash>.joblib, keyed by the
+# dataset contents. Bump the version when preprocess() changes.
+PREP_CACHE_VERSION = 1
+
+# Boosting rounds per search fit; early stopping usually ends it sooner
+MAX_BOOST_ROUNDS = 300
+EARLY_STOPPING_ROUNDS = 25
+
+# Hyperparameter combinations tried by the search
+N_SEARCH_TRIALS = 10
+
+# Test rows used for the clustering metrics
+CLUSTER_METRICS_SAMPLE = 2000
+
+# Train on the GPU when CuPy can see a CUDA device (XGBoost >= 2.0), else CPU
+try:
+    import cupy as cp
+    DEVICE = 'cuda' if cp.cuda.runtime.getDeviceCount() > 0 else 'cpu'
+except Exception:
+    cp = None
+    DEVICE = 'cpu'
+
+# Column types of DATA_FILE (see dataset1.py), so the reader skips type inference
+CAT_COLS = [
+    'Gender', 'Family_History', 'Consanguinity', 'Primary_Gene_Symbol',
+    'Persistent_Thrush', 'Chronic_Diarrhea', 'Failure_to_Thrive', 'History_IV_Antibiotics'
+]
+NUM_COLS = [
+    'Age_Years', 'Infection_Ear_Freq', 'Infection_Lung_Freq', 'Lab_ALC_Level', 'Lab_IgG_Level',
+    'Gene_Exp_IL2RG', 'Gene_Exp_ADA', 'Gene_Exp_BTK', 'Gene_Exp_JAK3', 'Gene_Exp_RAG1',
+    'Gene_Exp_RAG2', 'Gene_Exp_IL7R', 'Gene_Exp_CD3D', 'Gene_Exp_CD3E', 'Gene_Exp_ZAP70',
+    'Gene_Exp_LIG4', 'Control_Gene_GAPDH', 'Control_Gene_ACTB'
+]
+CSV_DTYPES = {**{col: 'category' for col in CAT_COLS}, **{col: 'float64' for col in NUM_COLS}}
+
+# The pyarrow CSV parser is multi-threaded; fall back to the C engine without it
+try:
+    import pyarrow  # noqa: F401
+    CSV_ENGINE = 'pyarrow'
+except ImportError:
+    CSV_ENGINE = 'c'
+
+# Optuna is optional; without it the search samples parameters at random
+try:
+    import optuna
+except ImportError:
+    optuna = None
+
+try:
+    from numba import njit, prange
+except ImportError:  # Numba is optional; fall back to NumPy for feature scaling
+    njit = None
+    prange = range
+
+def _column_moments(arr, n_chunks):
+    """Per-column mean and population variance of a 2-D array in one pass.
+
+    Each row chunk runs Welford's update in float64; the chunk results are
+    merged with Chan et al.'s pairwise formula.
+    """
+    n_rows, n_cols = arr.shape
+    counts = np.zeros(n_chunks)
+    means = np.zeros((n_chunks, n_cols))
+    m2s = np.zeros((n_chunks, n_cols))
+    for c in prange(n_chunks):
+        start = c * n_rows // n_chunks
+        stop = (c + 1) * n_rows // n_chunks
+        for i in range(start, stop):
+            k = i - start + 1
+            for j in range(n_cols):
+                x = np.float64(arr[i, j])
+                delta = x - means[c, j]
+                means[c, j] += delta / k
+                m2s[c, j] += delta * (x - means[c, j])
+        counts[c] = stop - start
 
+    n = 0.0
+    mean = np.zeros(n_cols)
+    m2 = np.zeros(n_cols)
+    for c in range(n_chunks):
+        if counts[c] == 0:
+            continue
+        total = n + counts[c]
+        delta = means[c] - mean
+        mean += delta * (counts[c] / total)
+        m2 += m2s[c] + delta * delta * (n * counts[c] / total)
+        n = total
+    return mean, m2 / n
+
+def _standardize_rows(arr, mean, scale):
+    """(x - mean) / scale, written back into `arr`"""
+    for i in prange(arr.shape[0]):
+        for j in range(arr.shape[1]):
+            arr[i, j] = (arr[i, j] - mean[j]) / scale[j]
+
+def _column_moments_numpy(arr, n_chunks):
+    """NumPy equivalent of _column_moments when Numba is not installed"""
+    return arr.mean(axis=0, dtype=np.float64), arr.var(axis=0, dtype=np.float64)
+
+def _standardize_rows_numpy(arr, mean, scale):
+    """NumPy equivalent of _standardize_rows when Numba is not installed"""
+    np.subtract(arr, mean, out=arr)
+    np.divide(arr, scale, out=arr)
+
+if njit is not None:
+    column_moments = njit(parallel=True, cache=True)(_column_moments)
+    standardize_rows = njit(parallel=True, cache=True)(_standardize_rows)
+else:
+    column_moments = _column_moments_numpy
+    standardize_rows = _standardize_rows_numpy
+
+def fit_scaler_inplace(arr, columns):
+    """Standardize `arr` in place and return the equivalent fitted StandardScaler.
+
+    Same statistics as StandardScaler().fit(arr), without the temporary
+    arrays it allocates; the scaler is what the APIs use at inference.
+    """
+    mean, var = column_moments(arr, os.cpu_count() or 1)
+    scale = np.sqrt(var)
+    # Constant columns are left unscaled, as StandardScaler does
+    scale[scale < 10 * np.finfo(scale.dtype).eps] = 1.0
+    standardize_rows(arr, mean, scale)
+
+    scaler = StandardScaler()
+    scaler.mean_ = mean
+    scaler.var_ = var
+    scaler.scale_ = scale
+    scaler.n_samples_seen_ = arr.shape[0]
+    scaler.n_features_in_ = arr.shape[1]
+    scaler.feature_names_in_ = np.asarray(columns, dtype=object)
+    return scaler
+
+def data_fingerprint(path):
+    """Short blake2b digest of a file's contents and PREP_CACHE_VERSION"""
+    digest = hashlib.blake2b(digest_size=8)
+    digest.update(str(PREP_CACHE_VERSION).encode())
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def preprocess(df):
+    """Encode, scale and weight the raw dataset. Returns the arrays to train on
+    plus the encoders/scaler the live app needs to prepare inputs."""
     # ==========================================
     # 2. PREPROCESSING
     # ==========================================
     
     # A. Feature Selection
-    X = df.drop(columns=[
-        'Patient_Name', 'Diagnosis_Target', 'Risk_Score_Prediction', 
+    # Take the target out and drop the unused columns in place rather than
+    # copying every kept column into a new frame
+    y = df.pop('Diagnosis_Target')
+    df.drop(columns=[
+        'Patient_Name', 'Risk_Score_Prediction', 
         'Severity_Level', 'Recommended_Action'
-    ])
-    y = df['Diagnosis_Target']
+    ], inplace=True)
+    X = df
 
     # B. Encoding Categoricals
-    # We save these to ensure the live app encodes inputs exactly the same way
+    # We save these to ensure the live app encodes inputs exactly the same way.
+    # Each feature encoder is the Index of its categories: position = code.
+    # Codes follow first appearance (no sort); missing values (e.g. no primary
+    # gene) are a category of their own.
     encoders = {}
-    categorical_cols = X.select_dtypes(include=['object']).columns
-    
-    print(f"   > Encoding {len(categorical_cols)} categorical features...")
-    for col in categorical_cols:
-        le = LabelEncoder()
-        X[col] = le.fit_transform(X[col])
-        encoders[col] = le
+    print(f"   > Encoding {len(CAT_COLS)} categorical features...")
+    for col in CAT_COLS:
+        codes, uniques = pd.factorize(X[col], sort=False, use_na_sentinel=False)
+        X[col] = codes.astype(np.int16 if len(uniques) < 32768 else np.int32)
+        # Plain Index of the values, not a CategoricalIndex, so artifacts stay the same
+        encoders[col] = pd.Index(np.asarray(uniques))
 
     # C. Encoding Target
     target_encoder = LabelEncoder()
     y_encoded = target_encoder.fit_transform(y)
     encoders['Diagnosis_Target'] = target_encoder
 
+    # Every column is numeric now: from here on the features are one
+    # contiguous float32 array, so XGBoost and sklearn never convert the frame
+    feature_names = list(X.columns)
+    X = np.ascontiguousarray(X.to_numpy(dtype=np.float32))
+
     # D. Scaling Numerical Values (New Robustness Step)
     # This helps when gene expression ranges (-5 to 5) differ from ALC (0 to 5000)
-    scaler = StandardScaler()
-    numerical_cols = X.select_dtypes(include=['int64', 'float64']).columns
-    X[numerical_cols] = scaler.fit_transform(X[numerical_cols])
+    # Scale the float32 array in place: half the memory traffic of float64
+    # and no temporaries. The scaler keeps its statistics (mean_/scale_) for
+    # inference.
+    scaler = fit_scaler_inplace(X, feature_names)
 
     # ==========================================
     # 3. HANDLING IMBALANCE (CRITICAL FOR MEDTECH)
     # ==========================================
     # We calculate weights so the model pays more attention to rare diseases
     print("   > Calculating Class Weights for Imbalance handling...")
-    sample_weights = compute_sample_weight(
-        class_weight='balanced',
-        y=y_encoded
-    )
+    # 'balanced' weighting, n_samples / (n_classes * class_count), as a
+    # float32 lookup per sample
+    class_counts = np.bincount(y_encoded)
+    class_weights = y_encoded.size / (class_counts.size * class_counts)
+    sample_weights = class_weights[y_encoded].astype(np.float32)
+
+    return {
+        'X': X,
+        'y': y_encoded,
+        'sample_weights': sample_weights,
+        'feature_names': feature_names,
+        'encoders': encoders,
+        'scaler': scaler,
+    }
+
+def cross_validate(params, folds, booster_params, report=None):
+    """Train `params` on each (dtrain, dval) fold with early stopping.
+
+    Returns the mean best validation log-loss and the average number of
+    rounds the folds kept, which the final model is refit with.
+    `report(fold, mean_score_so_far)` runs after every fold and may raise to
+    abandon the candidate.
+    """
+    fold_scores, fold_rounds = [], []
+    for fold, (dtrain, dval) in enumerate(folds):
+        booster = xgb.train(
+            {**booster_params, **params}, dtrain, num_boost_round=MAX_BOOST_ROUNDS,
+            evals=[(dval, 'val')], early_stopping_rounds=EARLY_STOPPING_ROUNDS, verbose_eval=False
+        )
+        fold_scores.append(booster.best_score)
+        fold_rounds.append(booster.best_iteration + 1)
+        if report is not None:
+            report(fold, float(np.mean(fold_scores)))
+    return float(np.mean(fold_scores)), int(round(np.mean(fold_rounds)))
+
+def scores_from_confusion(cm):
+    """Label-based test metrics from a K x K confusion matrix (rows = true class).
+
+    Same definitions as the sklearn scorers of the same names; classes with
+    no predictions (or no samples) score 0 instead of warning.
+    """
+    tp = np.diag(cm).astype(np.float64)
+    support = cm.sum(axis=1)
+    predicted = cm.sum(axis=0)
+    n = cm.sum()
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        precision = np.where(predicted > 0, tp / predicted, 0.0)
+        recall = np.where(support > 0, tp / support, 0.0)
+        f1 = np.where(support + predicted > 0, 2 * tp / (support + predicted), 0.0)
+
+    accuracy = tp.sum() / n
+    # Chance agreement, shared by MCC and kappa
+    agreement = float(np.dot(support, predicted))
+    mcc_denominator = np.sqrt((n * n - np.dot(predicted, predicted)) * (n * n - np.dot(support, support)))
+    return {
+        'accuracy': accuracy,
+        'balanced_accuracy': recall[support > 0].mean(),
+        'precision': precision,
+        'recall': recall,
+        'f1': f1,
+        'support': support,
+        'weighted_precision': np.average(precision, weights=support),
+        'weighted_recall': np.average(recall, weights=support),
+        'weighted_f1': np.average(f1, weights=support),
+        'macro_f1': f1.mean(),
+        # Every sample gets exactly one label, so micro-F1 is the accuracy
+        'micro_f1': accuracy,
+        'mcc': (tp.sum() * n - agreement) / mcc_denominator if mcc_denominator > 0 else 0.0,
+        'kappa': (accuracy - agreement / (n * n)) / (1 - agreement / (n * n)) if agreement < n * n else 0.0,
+    }
+
+def train_robust_model():
+    print("--- 1. Loading and Inspecting Data ---")
+    try:
+        cache_file = f"prep_{data_fingerprint(DATA_FILE)}.joblib"
+    except FileNotFoundError:
+        print(f"Error: {DATA_FILE} not found.")
+        return
+
+    # Reruns on an unchanged dataset reuse the preprocessed arrays; the
+    # cache is memory-mapped rather than read into RAM
+    if os.path.exists(cache_file):
+        print(f"   > Using preprocessed data from '{cache_file}'")
+        prep = joblib.load(cache_file, mmap_mode='r')
+    else:
+        prep = preprocess(pd.read_csv(DATA_FILE, engine=CSV_ENGINE, dtype=CSV_DTYPES))
+        joblib.dump(prep, cache_file)
+
+    X, y_encoded, sample_weights = prep['X'], prep['y'], prep['sample_weights']
+    feature_names, encoders, scaler = prep['feature_names'], prep['encoders'], prep['scaler']
+    target_encoder = encoders['Diagnosis_Target']
 
     # Split Data (80% Train, 20% Test)
     # Stratify ensures both sets have the same % of sick patients
@@ -77,79 +313,151 @@ def train_robust_model():
     # ==========================================
     # 4. HYPERPARAMETER TUNING & CROSS VALIDATION
     # ==========================================
-    print("\n--- 2. Starting Robust Training (Grid Search) ---")
+    print(f"\n--- 2. Starting Robust Training ({'Optuna TPE' if optuna is not None else 'Randomized'} Search) ---")
     
-    # Define the parameter grid to search through
-    param_grid = {
-        'n_estimators': [100, 200, 300],
-        'learning_rate': [0.01, 0.05, 0.1, 0.2],
-        'max_depth': [3, 4, 5, 6],
-        'subsample': [0.8, 1.0],
-        'colsample_bytree': [0.8, 1.0]
+    # Define the distributions to sample parameters from (random search). The number of trees
+    # is not searched: each candidate boosts up to MAX_BOOST_ROUNDS and early
+    # stopping finds where it stops improving, whatever the learning rate.
+    param_distributions = {
+        'learning_rate': loguniform(1e-2, 2e-1),
+        'max_depth': randint(3, 7),
+        'subsample': uniform(0.6, 0.4),          # 0.6 - 1.0
+        'colsample_bytree': uniform(0.6, 0.4)    # 0.6 - 1.0
     }
 
-    xgb_clf = xgb.XGBClassifier(
-        objective='multi:softprob', 
-        random_state=42,
-        eval_metric='mlogloss'
-    )
+    # Settings shared by the search and the final model
+    xgb_params = {
+        'objective': 'multi:softprob',
+        'device': DEVICE,
+        # Quantized histogram split finding: bins x features per node instead
+        # of a sorted scan over every sample
+        'tree_method': 'hist',
+        'max_bin': 256,
+        'eval_metric': 'mlogloss',
+    }
+    print(f"   > Training device: {DEVICE}")
 
-    # RandomizedSearchCV performs Cross-Validation automatically
-    # It tries random combinations to find the "Best" model
-    search = RandomizedSearchCV(
-        xgb_clf, 
-        param_distributions=param_grid, 
-        n_iter=10,             # Try 10 different combinations
-        scoring='accuracy', 
-        cv=5,                  # 5-Fold Cross Validation
-        verbose=1, 
-        random_state=42,
-        n_jobs=-1              # Use all CPU cores
-    )
+    # Quantize each cross-validation fold once (5-Fold, stratified). Every
+    # candidate trains on the same binned matrices instead of re-sketching the
+    # data per fit. Training runs one fit at a time, each using every core.
+    folds = []
+    for train_idx, val_idx in StratifiedKFold(n_splits=5).split(X_train, y_train):
+        fold_train, fold_val = X_train[train_idx], X_train[val_idx]
+        if DEVICE == 'cuda':
+            # Copy each fold to the device once instead of once per candidate
+            fold_train, fold_val = cp.asarray(fold_train), cp.asarray(fold_val)
+        dtrain = xgb.QuantileDMatrix(
+            fold_train, label=y_train[train_idx], weight=w_train[train_idx], max_bin=xgb_params['max_bin']
+        )
+        dval = xgb.QuantileDMatrix(
+            fold_val, label=y_train[val_idx], weight=w_train[val_idx], ref=dtrain
+        )
+        folds.append((dtrain, dval))
+
+    # Search for the combination with the lowest mean validation log-loss
+    # (Notice the folds carry the sample weights!)
+    booster_params = {**xgb_params, 'num_class': len(target_encoder.classes_), 'seed': 42}
+    print(f"   > Fitting {len(folds)} folds for each of {N_SEARCH_TRIALS} candidates, up to {len(folds) * N_SEARCH_TRIALS} fits")
+    if optuna is not None:
+        # TPE picks each candidate from how the previous ones scored; the
+        # pruner drops a candidate after any fold where it trails the median
+        # of earlier trials. Same ranges as param_distributions.
+        def objective(trial):
+            params = {
+                'learning_rate': trial.suggest_float('learning_rate', 1e-2, 2e-1, log=True),
+                'max_depth': trial.suggest_int('max_depth', 3, 6),
+                'subsample': trial.suggest_float('subsample', 0.6, 1.0),
+                'colsample_bytree': trial.suggest_float('colsample_bytree', 0.6, 1.0),
+            }
+
+            def report(fold, score):
+                trial.report(score, fold)
+                if trial.should_prune():
+                    raise optuna.TrialPruned()
 
-    # Fit the search (Notice we pass sample_weight here!)
-    search.fit(X_train, y_train, sample_weight=w_train)
+            score, n_rounds = cross_validate(params, folds, booster_params, report)
+            trial.set_user_attr('n_estimators', n_rounds)
+            return score
 
-    best_model = search.best_estimator_
-    print(f"\n   > Best Parameters Found: {search.best_params_}")
+        optuna.logging.set_verbosity(optuna.logging.WARNING)
+        study = optuna.create_study(
+            direction='minimize',
+            # The first half of the budget is random exploration
+            sampler=optuna.samplers.TPESampler(n_startup_trials=N_SEARCH_TRIALS // 2, seed=42),
+            pruner=optuna.pruners.MedianPruner(n_startup_trials=3)
+        )
+        study.optimize(objective, n_trials=N_SEARCH_TRIALS)
+        best_params = {**study.best_params, 'n_estimators': study.best_trial.user_attrs['n_estimators']}
+        best_score = study.best_value
+    else:
+        # Without Optuna, try random combinations
+        best_params, best_score = None, np.inf
+        for params in ParameterSampler(param_distributions, n_iter=N_SEARCH_TRIALS, random_state=42):
+            # NumPy scalars -> Python, so best_params stays JSON-friendly
+            params = {k: v.item() if isinstance(v, np.generic) else v for k, v in params.items()}
+            score, n_rounds = cross_validate(params, folds, booster_params)
+            if score < best_score:
+                best_params = {**params, 'n_estimators': n_rounds}
+                best_score = score
+
+    print(f"\n   > Best Parameters Found: {best_params} (CV log-loss {best_score:.4f})")
+
+    # Refit the best combination on the whole training split
+    best_model = xgb.XGBClassifier(**xgb_params, **best_params, random_state=42)
+    best_model.fit(X_train, y_train, sample_weight=w_train)
+    # Fitted on a bare array; keep the column names in the saved booster
+    best_model.get_booster().feature_names = feature_names
+    # The serving processes are CPU-only; don't save a booster configured for CUDA.
+    # This also keeps the test-set evaluation below on the host arrays it is given.
+    best_model.set_params(device='cpu')
 
     # ==========================================
     # 5. FINAL EVALUATION
     # ==========================================
     print("\n--- 3. Final Evaluation on Test Set ---")
     
-    y_pred = best_model.predict(X_test)
+    # One pass over the trees: the predicted class is the most probable one
     y_pred_proba = best_model.predict_proba(X_test)
-    acc = accuracy_score(y_test, y_pred)
+    y_pred = y_pred_proba.argmax(axis=1)
+
+    # Confusion Matrix: one pass over the predictions; the label metrics
+    # below are all derived from it
+    cm = confusion_matrix(y_test, y_pred, labels=np.arange(len(target_encoder.classes_)))
+    scores = scores_from_confusion(cm)
+    acc = scores['accuracy']
     
     print(f"   > Model Accuracy: {acc * 100:.2f}%")
     print("\n   > Detailed Classification Report:")
-    report = classification_report(y_test, y_pred, target_names=target_encoder.classes_, output_dict=True)
     print(classification_report(y_test, y_pred, target_names=target_encoder.classes_))
     
-    # Confusion Matrix
-    cm = confusion_matrix(y_test, y_pred)
     print("\n   > Confusion Matrix:")
     print(cm)
     
     # Extract comprehensive metrics
-    per_class_metrics = {}
-    for cls in target_encoder.classes_:
-        if cls in report:
-            per_class_metrics[cls] = report[cls]
+    per_class_metrics = {
+        cls: {
+            'precision': float(scores['precision'][i]),
+            'recall': float(scores['recall'][i]),
+            'f1-score': float(scores['f1'][i]),
+            'support': int(scores['support'][i])
+        }
+        for i, cls in enumerate(target_encoder.classes_)
+    }
     
     # Additional Accuracy Metrics
-    balanced_acc = balanced_accuracy_score(y_test, y_pred)
-    macro_f1 = f1_score(y_test, y_pred, average='macro')
-    micro_f1 = f1_score(y_test, y_pred, average='micro')
-    mcc = matthews_corrcoef(y_test, y_pred)
-    kappa = cohen_kappa_score(y_test, y_pred)
+    balanced_acc = scores['balanced_accuracy']
+    macro_f1 = scores['macro_f1']
+    micro_f1 = scores['micro_f1']
+    mcc = scores['mcc']
+    kappa = scores['kappa']
     
     # Classification Metrics
     try:
         roc_auc = roc_auc_score(y_test, y_pred_proba, multi_class='ovr', average='weighted')
         logloss = log_loss(y_test, y_pred_proba)
-        brier = np.mean([brier_score_loss(y_test == i, y_pred_proba[:, i]) for i in range(len(target_encoder.classes_))])
+        # Mean of the one-vs-rest Brier scores = mean squared error against one-hot labels
+        one_hot = np.eye(len(target_encoder.classes_), dtype=np.float32)[y_test]
+        brier = float(np.mean(np.square(one_hot - y_pred_proba)))
         classification_metrics = {
             'roc_auc': f"{roc_auc:.4f}",
             'log_loss': f"{logloss:.4f}",
@@ -158,17 +466,22 @@ def train_robust_model():
             'tn': int((cm.sum() - cm.sum(axis=0) - cm.sum(axis=1) + np.diag(cm)).sum() / len(cm)),
             'fp': int((cm.sum(axis=0) - np.diag(cm)).sum()),
             'fn': int((cm.sum(axis=1) - np.diag(cm)).sum()),
-            'sensitivity': f"{report['weighted avg']['recall']:.4f}",
+            'sensitivity': f"{scores['weighted_recall']:.4f}",
             'specificity': 'N/A (multi-class)'
         }
     except:
         classification_metrics = {}
     
     # Clustering Metrics (Feature space analysis)
+    # Informational only, and silhouette is O(N^2): score a fixed random subset
     try:
-        silhouette = silhouette_score(X_test, y_test)
-        davies_bouldin = davies_bouldin_score(X_test, y_test)
-        calinski = calinski_harabasz_score(X_test, y_test)
+        sample = np.random.default_rng(42).choice(
+            len(X_test), size=min(CLUSTER_METRICS_SAMPLE, len(X_test)), replace=False
+        )
+        X_sample, y_sample = X_test[sample], y_test[sample]
+        silhouette = silhouette_score(X_sample, y_sample, metric='euclidean')
+        davies_bouldin = davies_bouldin_score(X_sample, y_sample)
+        calinski = calinski_harabasz_score(X_sample, y_sample)
         clustering_metrics = {
             'silhouette': f"{silhouette:.4f}",
             'davies_bouldin': f"{davies_bouldin:.4f}",
@@ -180,9 +493,9 @@ def train_robust_model():
     metrics = {
         'accuracy': f"{acc * 100:.2f}%",
         'balanced_accuracy': f"{balanced_acc:.4f}",
-        'precision': f"{report['weighted avg']['precision']:.4f}",
-        'recall': f"{report['weighted avg']['recall']:.4f}",
-        'f1_score': f"{report['weighted avg']['f1-score']:.4f}",
+        'precision': f"{scores['weighted_precision']:.4f}",
+        'recall': f"{scores['weighted_recall']:.4f}",
+        'f1_score': f"{scores['weighted_f1']:.4f}",
         'macro_f1': f"{macro_f1:.4f}",
         'micro_f1': f"{micro_f1:.4f}",
         'mcc': f"{mcc:.4f}",
@@ -190,7 +503,7 @@ def train_robust_model():
         'per_class': per_class_metrics,
         'confusion_matrix': cm.tolist(),
         'class_names': list(target_encoder.classes_),
-        'best_params': search.best_params_,
+        'best_params': best_params,
         'classification': classification_metrics,
         'clustering': clustering_metrics
     }
@@ -202,12 +515,20 @@ def train_robust_model():
         'model': best_model,
         'encoders': encoders,
         'scaler': scaler,
-        'feature_names': list(X.columns),
+        'feature_names': feature_names,
         'metrics': metrics
     }
     
     joblib.dump(artifacts, MODEL_FILE)
     print(f"\n[SUCCESS] Robust Model saved to '{MODEL_FILE}'")
 
+    # Pickle-free copies for fast API cold starts (needs safetensors)
+    try:
+        from export_artifacts import export_artifacts
+    except ImportError:
+        print("   > safetensors not installed; skipping pickle-free artifacts (see export_artifacts.py)")
+    else:
+        export_artifacts(artifacts)
+
 if __name__ == "__main__":
     train_robust_model()
\ No newline at end of file
@@ -1,9 +1,8 @@
-import { spawn } from 'child_process';
-import path from 'path';
+import axios from 'axios';
 
-// Path to the Python inference script
-const INFERENCE_SCRIPT = path.resolve(__dirname, '../../../ai/counselors/inference.py');
-const PYTHON_PATH = process.env.PYTHON_PATH || 'python';
+// Long-running ML prediction service (ai/counselors/api.py)
+const ML_API_URL = process.env.ML_API_URL || 'http://localhost:5001';
+const ML_API_TIMEOUT_MS = 10000;
 
 interface PatientData {
   ageYears: number;
@@ -41,43 +40,15 @@ export interface PredictionResult {
 }
 
 /**
- * Run Python inference script and get prediction
+ * Call the ML prediction service over HTTP
  */
-function runPythonInference(inputData: object): Promise<any> {
-  return new Promise((resolve, reject) => {
-    const jsonInput = JSON.stringify(inputData);
-    const pythonProcess = spawn(PYTHON_PATH, [INFERENCE_SCRIPT, jsonInput]);
-    
-    let stdout = '';
-    let stderr = '';
-    
-    pythonProcess.stdout.on('data', (data) => {
-      stdout += data.toString();
-    });
-    
-    pythonProcess.stderr.on('data', (data) => {
-      stderr += data.toString();
-    });
-    
-    pythonProcess.on('close', (code) => {
-      if (code !== 0) {
-        console.error('Python stderr:', stderr);
-        reject(new Error(`Python process exited with code ${code}: ${stderr}`));
-        return;
-      }
-      
-      try {
-        const result = JSON.parse(stdout.trim());
-        resolve(result);
-      } catch (e) {
-        reject(new Error(`Failed to parse Python output: ${stdout}`));
-      }
-    });
-    
-    pythonProcess.on('error', (err) => {
-      reject(new Error(`Failed to start Python process: ${err.message}`));
-    });
-  });
+async function requestPrediction(patientData: PatientData, geneData?: GeneData): Promise<any> {
+  const response = await axios.post(
+    `${ML_API_URL}/predict`,
+    { patientData, geneData },
+    { timeout: ML_API_TIMEOUT_MS }
+  );
+  return response.data;
 }
 
 /**
@@ -88,19 +59,24 @@ export async function getPrediction(
   geneData?: GeneData
 ): Promise<PredictionResult> {
   try {
-    const result = await runPythonInference(patientData);
+    const result = await requestPrediction(patientData, geneData);
     
     if (result.success && result.prediction) {
       // Map the Python response to our expected format
       const pred = result.prediction;
+      // The API reports class probabilities as fractions; keep percentages here
+      const probabilities: Record<string, number> = {};
+      for (const [cls, prob] of Object.entries(pred.allProbabilities || {})) {
+        probabilities[cls] = Number(prob) * 100;
+      }
       return {
         diagnosis: pred.diagnosis,
         confidence: pred.confidence,
         riskLevel: pred.riskLevel || 'moderate',
-        riskScore: pred.confidence,
-        probabilities: pred.probabilities || {},
+        riskScore: pred.riskScore ?? pred.confidence,
+        probabilities,
         recommendations: pred.recommendations || [],
-        featureImportance: [],
+        featureImportance: pred.featureImportance || [],
         modelVersion: pred.modelVersion || '1.0.0',
       };
     } else {
@@ -118,8 +94,8 @@ export async function getPrediction(
  */
 export async function checkMLServiceHealth(): Promise<boolean> {
   try {
-    const result = await runPythonInference({});
-    return result.success && result.modelLoaded;
+    const response = await axios.get(`${ML_API_URL}/health`, { timeout: ML_API_TIMEOUT_MS });
+    return response.data.status === 'healthy' && response.data.model_loaded;
   } catch {
     return false;
   }